@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+# encoding: utf-8
+
+# Compares encode_publish_point with the earlier DecimalEncoder based
+# serialization of the monitor publish envelope, on a mix of messages
+# similar to what monitor_publish produces.
+#
+#   python benchmarks/monitors_publish_encoding.py [-n ITERATIONS] [-r REPEAT]
+
+
+import json
+import random
+import timeit
+import argparse
+from decimal import Decimal
+
+from tendril.monitors.spec import DecimalEncoder
+from tendril.monitors.spec import encode_publish_point
+
+
+def _units():
+    try:
+        from tendril.utils.types.electromagnetic import Voltage
+        from tendril.utils.types.thermodynamic import Temperature
+    except ImportError:
+        return []
+    return [lambda: Voltage('3.3V'), lambda: Temperature('25C')]
+
+
+def _values(rng):
+    return [
+        lambda: Decimal(rng.randint(0, 10 ** 6)) / 1000,
+        lambda: rng.random() * 100,
+        lambda: rng.randint(0, 2 ** 31),
+        lambda: rng.random() > 0.5,
+        lambda: rng.choice(['ok', 'degraded', 'offline']),
+        lambda: None,
+    ] + _units()
+
+
+def make_points(count, seed=0):
+    rng = random.Random(seed)
+    values = _values(rng)
+    points = []
+    for i in range(count):
+        if rng.random() < 0.8:
+            fields = {'value': rng.choice(values)()}
+        else:
+            fields = {f'f{j}': rng.choice(values)() for j in range(rng.randint(2, 6))}
+        tags = {
+            'id': str(rng.randint(1, 500)),
+            'site': f'site{rng.randint(1, 10)}',
+            'zone': f'zone{rng.randint(1, 40)}',
+            'device': f'device{rng.randint(1, 500)}',
+        }
+        if rng.random() < 0.2:
+            # Numeric additional localizers, such as channel numbers
+            tags['channel'] = rng.choice([rng.randint(0, 15), Decimal(rng.randint(0, 99)) / 10])
+        points.append({
+            'measurement': f'sensor_{i % 20}',
+            'tags': tags,
+            'fields': fields,
+            'timestamp': 1700000000000000000 + i,
+        })
+    return points
+
+
+def encode_legacy(points):
+    for point in points:
+        json.dumps(point, cls=DecimalEncoder)
+
+
+def encode_envelope(points):
+    for point in points:
+        encode_publish_point(point)
+
+
+def check_equivalent(points):
+    for point in points:
+        legacy = json.loads(json.dumps(point, cls=DecimalEncoder))
+        envelope = json.loads(encode_publish_point(point))
+        if legacy != envelope:
+            raise AssertionError(f"Encoders disagree for {point} : {legacy} != {envelope}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Benchmark monitor publish envelope encoders')
+    parser.add_argument('-p', '--points', type=int, default=1000,
+                        help='Number of distinct messages in the mix')
+    parser.add_argument('-n', '--number', type=int, default=20,
+                        help='Passes over the mix per measurement')
+    parser.add_argument('-r', '--repeat', type=int, default=5,
+                        help='Number of measurements, the best is reported')
+    parser.add_argument('-s', '--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    points = make_points(args.points, seed=args.seed)
+    check_equivalent(points)
+
+    messages = args.points * args.number
+    results = {}
+    for name, fn in (('DecimalEncoder', encode_legacy),
+                     ('encode_publish_point', encode_envelope)):
+        best = min(timeit.repeat(lambda: fn(points), number=args.number, repeat=args.repeat))
+        results[name] = best
+        print(f"{name:>22} : {best:8.4f}s for {messages} messages, "
+              f"{best / messages * 1e6:7.2f} us/message")
+    print(f"{'speedup':>22} : "
+          f"{results['DecimalEncoder'] / results['encode_publish_point']:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -25,8 +25,11 @@ from tendril.common.interests.representations import get_interest_stub
 
 from tendril.common.interests.memberships import user_memberships
 from tendril.common.interests.memberships import UserMembershipsTModel
+from tendril.monitors.ingest import monitor_ingest_pipeline
+from tendril.monitors.scheduler import start_monitors_heartbeat
 
 from tendril.config import INTERESTS_API_ENABLED
+from tendril.config import INTERESTS_MONITORS_HEARTBEAT_ENABLED
 
 from tendril.utils.db import get_session
 from tendril.utils import log
@@ -40,6 +43,20 @@ interests_router = APIRouter(prefix='/interests',
                              )
 
 
+# Process level metrics of the interests subsystem, alongside the other
+# system monitoring endpoints.
+interests_monitoring_router = APIRouter(prefix='/system/interests',
+                                        tags=["System Monitoring"],
+                                        dependencies=[Depends(authn_dependency),
+                                                      auth_spec(scopes=['system:monitoring'])]
+                                        )
+
+
+@interests_monitoring_router.get("/monitors/ingest")
+async def get_monitors_ingest_metrics():
+    return monitor_ingest_pipeline.metrics()
+
+
 @interests_router.get("/libraries", response_model=Dict[str, str])
 async def get_interest_libraries():
     return interests.libraries_and_types
@@ -132,9 +149,19 @@ def _generate_routers():
     return interest_routers
 
 
+async def _start_monitors_heartbeat():
+    start_monitors_heartbeat()
+
+
 if INTERESTS_API_ENABLED:
+    if INTERESTS_MONITORS_HEARTBEAT_ENABLED:
+        # Registered on the root application, since startup handlers of
+        # routers included in a prefixed sub-application are not run.
+        from tendril.apiserver.core import apiserver
+        apiserver.add_event_handler('startup', _start_monitors_heartbeat)
     routers = [
-        interests_router
+        interests_router,
+        interests_monitoring_router,
     ] + _generate_routers()
 else:
     logger.info("Not creating Interest API routers.")
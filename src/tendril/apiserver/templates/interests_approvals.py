@@ -16,6 +16,9 @@ from tendril.authn.users import authn_dependency
 from tendril.apiserver.templates.base import ApiRouterGenerator
 from tendril.common.interests.approvals import ApprovalRequirementTModel
 from tendril.common.interests.approvals import InterestApprovalStatusTModel
+from tendril.common.interests.approvals import ApprovalInboxTModel
+from tendril.common.interests.approvals import ApprovalBulkTModel
+from tendril.common.interests.approvals import ApprovalBulkResultTModel
 
 from tendril.utils.db import get_session
 
@@ -101,6 +104,30 @@ class InterestApprovalContextRouterGenerator(ApiRouterGenerator):
             else:
                 return {'subject': id, 'contexts': []}
 
+    async def get_approvals_inbox(self, request: Request, id: int,
+                                  offset: int = 0, limit: Optional[int] = None,
+                                  user: AuthUserModel = auth_spec()):
+        with get_session() as session:
+            context = self._actual.item(id, session=session)
+            return context.approvals_inbox(offset=offset, limit=limit,
+                                           auth_user=user, session=session)
+
+    async def grant_approvals_bulk(self, request: Request, id: int,
+                                   bulk: ApprovalBulkTModel,
+                                   user: AuthUserModel = auth_spec()):
+        with get_session() as session:
+            context = self._actual.item(id, session=session)
+            return context.approvals_bulk(bulk.subjects, bulk.approval_type,
+                                          auth_user=user, session=session)
+
+    async def reject_approvals_bulk(self, request: Request, id: int,
+                                    bulk: ApprovalBulkTModel,
+                                    user: AuthUserModel = auth_spec()):
+        with get_session() as session:
+            context = self._actual.item(id, session=session)
+            return context.approvals_bulk(bulk.subjects, bulk.approval_type, reject=True,
+                                          auth_user=user, session=session)
+
     async def grant_approval(self, request: Request, id: int,
                              subject_id: int, approval_type: str = None,
                              user: AuthUserModel = auth_spec()):
@@ -128,6 +155,22 @@ class InterestApprovalContextRouterGenerator(ApiRouterGenerator):
         router = APIRouter(prefix=f'/{name}', tags=[desc],
                            dependencies=[Depends(authn_dependency)])
 
+        router.add_api_route("/{id}/approvals/inbox", self.get_approvals_inbox, methods=["GET"],
+                             response_model=ApprovalInboxTModel,
+                             response_model_exclude_none=True,
+                             dependencies=[auth_spec(scopes=[f'{prefix}:read'])])
+
+        # These need to be ahead of the /{id}/approvals/{subject_id}/* routes
+        router.add_api_route("/{id}/approvals/bulk/grant", self.grant_approvals_bulk, methods=["POST"],
+                             response_model=List[ApprovalBulkResultTModel],
+                             response_model_exclude_none=True,
+                             dependencies=[auth_spec(scopes=[f'{prefix}:write'])])
+
+        router.add_api_route("/{id}/approvals/bulk/reject", self.reject_approvals_bulk, methods=["POST"],
+                             response_model=List[ApprovalBulkResultTModel],
+                             response_model_exclude_none=True,
+                             dependencies=[auth_spec(scopes=[f'{prefix}:write'])])
+
         router.add_api_route("/{id}/approvals/{subject_id}/status",
                              self.get_approvals, methods=["GET"],
                              # response_model=[],
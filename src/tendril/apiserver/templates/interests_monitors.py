@@ -7,6 +7,7 @@ from inflection import titleize
 from fastapi import APIRouter
 from fastapi import Request
 from fastapi import Depends
+from fastapi.responses import StreamingResponse
 
 from tendril.authn.users import auth_spec
 from tendril.authn.users import AuthUserModel
@@ -15,7 +16,10 @@ from tendril.authn.users import authn_dependency
 from tendril.apiserver.templates.base import ApiRouterGenerator
 from tendril.utils.db import get_session
 
+from tendril.monitors.streaming import monitor_stream_events
 from tendril.interests.mixins.monitors import MonitorsQueryTModel
+from tendril.interests.mixins.monitors import MonitorsMultiQueryTModel
+from tendril.interests.mixins.monitors import MonitorsBulkReportTModel
 
 
 class InterestMonitorsRouterGenerator(ApiRouterGenerator):
@@ -35,6 +39,16 @@ class InterestMonitorsRouterGenerator(ApiRouterGenerator):
             item = self._actual.item(id, session=session)
             return item.monitors_export()
 
+    async def get_monitors_stream(self, request: Request, id: int,
+                                  user: AuthUserModel = auth_spec()):
+        with get_session() as session:
+            item = self._actual.item(id, session=session)
+            tags = item.monitors_stream_filter(auth_user=user, session=session)
+            type_name = item.type_name
+        return StreamingResponse(monitor_stream_events(type_name, tags, request.is_disconnected),
+                                 media_type='text/event-stream',
+                                 headers={'Cache-Control': 'no-cache'})
+
     async def get_monitors_historical(self, id:int,
                                       query: MonitorsQueryTModel,
                                       user:AuthUserModel = auth_spec()):
@@ -42,6 +56,23 @@ class InterestMonitorsRouterGenerator(ApiRouterGenerator):
             item = self._actual.item(id, session=session)
             return await item.monitors_export_historical(query)
 
+    async def get_monitors_historical_multi(self, query: MonitorsMultiQueryTModel,
+                                            user: AuthUserModel = auth_spec()):
+        with get_session() as session:
+            items = self._actual.items_by_id(query.interests, session=session)
+            return await self._actual.interest_class.monitors_export_historical_multi(
+                items, query.query, auth_user=user, session=session
+            )
+
+    async def report_monitors_bulk(self, report: MonitorsBulkReportTModel,
+                                   user: AuthUserModel = auth_spec()):
+        with get_session() as session:
+            items = self._actual.items_by_id(list(report.reports.keys()), session=session)
+            count = await self._actual.interest_class.monitors_report_bulk(
+                items, report.reports, timestamp=report.timestamp,
+                auth_user=user, session=session
+            )
+        return {'interests': len(items), 'monitors': count}
 
     def generate(self, name):
         desc = f'Monitors API for {titleize(singularize(name))} Interests'
@@ -59,9 +90,20 @@ class InterestMonitorsRouterGenerator(ApiRouterGenerator):
                              response_model_exclude_none=True,
                              dependencies=[auth_spec(scopes=[f'{prefix}:read'])], )
 
+        router.add_api_route("/{id}/monitors/stream", self.get_monitors_stream, methods=["GET"],
+                             response_class=StreamingResponse,
+                             dependencies=[auth_spec(scopes=[f'{prefix}:read'])], )
+
         router.add_api_route("/{id}/monitors/historical", self.get_monitors_historical, methods=["POST"],
                              # response_model=List[self._actual.interest_class.export_tmodel_unified()],
                              response_model_exclude_none=True,
                              dependencies=[auth_spec(scopes=[f'{prefix}:read'])], )
 
+        router.add_api_route("/monitors/historical", self.get_monitors_historical_multi, methods=["POST"],
+                             response_model_exclude_none=True,
+                             dependencies=[auth_spec(scopes=[f'{prefix}:read'])], )
+
+        router.add_api_route("/monitors/report", self.report_monitors_bulk, methods=["POST"],
+                             dependencies=[auth_spec(scopes=[f'{prefix}:write'])], )
+
         return [router]
\ No newline at end of file
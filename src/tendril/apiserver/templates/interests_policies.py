@@ -1,6 +1,6 @@
 
 
-from typing import Any, Dict, List, Union, Annotated
+from typing import Any, Dict, List, Union, Annotated, Optional
 from inflection import singularize
 from inflection import titleize
 
@@ -8,6 +8,7 @@ from fastapi import APIRouter
 from fastapi import Request
 from fastapi import Depends
 from fastapi import Body
+from fastapi.responses import Response
 
 from tendril.authn.users import auth_spec
 from tendril.authn.users import AuthUserModel
@@ -15,6 +16,12 @@ from tendril.authn.users import authn_dependency
 
 from tendril.apiserver.templates.base import ApiRouterGenerator
 from tendril.utils.db import get_session
+from tendril.utils.pydantic import TendrilTBaseModel
+
+
+class PoliciesEffectiveQueryTModel(TendrilTBaseModel):
+    interests: List[int]
+    policies: Optional[List[str]]
 
 
 class InterestPolicyRouterGenerator(ApiRouterGenerator):
@@ -22,11 +29,15 @@ class InterestPolicyRouterGenerator(ApiRouterGenerator):
         super(InterestPolicyRouterGenerator, self).__init__()
         self._actual = actual
 
-    async def get_policy_spec(self, _request: Request, id: int,
+    async def get_policy_spec(self, request: Request, id: int,
                              _user: AuthUserModel = auth_spec()):
         with get_session() as session:
             item = self._actual.item(id, session=session)
-            return item.policies_spec()
+            content, etag = item.policies_spec_json()
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers={'ETag': etag})
+        return Response(content=content, media_type='application/json',
+                        headers={'ETag': etag})
 
     async def get_policies_current(self, _request: Request, id: int,
                                    user: AuthUserModel = auth_spec()):
@@ -47,6 +58,15 @@ class InterestPolicyRouterGenerator(ApiRouterGenerator):
             item = self._actual.item(id, session=session)
             return item.policy_set(name=name, policy=policy, auth_user=user, session=session)
 
+    async def get_policies_effective(self, _request: Request,
+                                     query: PoliciesEffectiveQueryTModel,
+                                     user: AuthUserModel = auth_spec()):
+        with get_session() as session:
+            items = self._actual.items_by_id(query.interests, session=session)
+            return self._actual.interest_class.policies_effective_multi(
+                items, names=query.policies, auth_user=user, session=session
+            )
+
     def generate(self, name):
         desc = f'Policy API for {titleize(singularize(name))} Interests'
         prefix = self._actual.interest_class.model.role_spec.prefix
@@ -73,4 +93,8 @@ class InterestPolicyRouterGenerator(ApiRouterGenerator):
                              response_model_exclude_none=True,
                              dependencies=[auth_spec(scopes=[f'{prefix}:write'])])
 
+        router.add_api_route("/policy/effective", self.get_policies_effective, methods=["POST"],
+                             response_model=Dict[int, Dict[str, Any]],
+                             dependencies=[auth_spec(scopes=[f'{prefix}:read'])])
+
         return [router]
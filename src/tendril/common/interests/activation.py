@@ -0,0 +1,74 @@
+
+
+import asyncio
+
+from tendril.utils.db import get_session
+from tendril.db.controllers.interests import get_interests
+
+from tendril.config import INTERESTS_APPROVALS_ACTIVATION_BATCH_SIZE
+from tendril.config import INTERESTS_APPROVALS_ACTIVATION_DELAY
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+class ActivationEvaluator(object):
+    # Deferred re-evaluation of interest activation after approval changes.
+    # Interest ids are deduplicated while pending and processed in batches,
+    # each in its own session in a worker thread.
+    #
+    # Approval signals are raised from within the request's session. The
+    # apiserver handlers complete and commit that session without yielding
+    # to the event loop, so the evaluator only runs once the approval is
+    # visible to other sessions.
+    def __init__(self, batch_size=50, delay=100):
+        self.batch_size = batch_size
+        self.delay = delay / 1000
+        self._pending = {}
+        self._task = None
+
+    def enqueue(self, interest_id):
+        # Returns False if there is no running event loop, in which case the
+        # caller is expected to evaluate activation itself.
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        self._pending[interest_id] = None
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run())
+        return True
+
+    def _next_batch(self):
+        batch = list(self._pending.keys())[:self.batch_size]
+        for interest_id in batch:
+            del self._pending[interest_id]
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while self._pending:
+            await asyncio.sleep(self.delay)
+            batch = self._next_batch()
+            try:
+                await loop.run_in_executor(None, self._process, batch)
+            except Exception as e:
+                logger.error(f"Could not re-evaluate activation for interests {batch} : {e}")
+
+    @staticmethod
+    def _process(batch):
+        from tendril.interests import type_codes
+        with get_session() as session:
+            for model in get_interests(ids=batch, session=session):
+                interest = type_codes[model.type_name](model)
+                try:
+                    interest.reevaluate_activation(session=session)
+                except Exception as e:
+                    logger.error(f"Could not re-evaluate activation for "
+                                 f"{interest.type_name} {interest.id} : {e}")
+
+
+activation_evaluator = ActivationEvaluator(
+    batch_size=INTERESTS_APPROVALS_ACTIVATION_BATCH_SIZE,
+    delay=INTERESTS_APPROVALS_ACTIVATION_DELAY,
+)
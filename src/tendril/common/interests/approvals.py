@@ -3,6 +3,7 @@
 import polars
 from typing import Any
 from typing import List
+from typing import Optional
 from typing import NamedTuple
 from pydantic import create_model_from_namedtuple
 from tendril.common.states import LifecycleStatus
@@ -36,70 +37,99 @@ class InterestApprovalStatusTModel(TendrilTBaseModel):
     contexts: List[ApprovalContextStatusTModel]
 
 
+class ApprovalInboxItemTModel(TendrilTBaseModel):
+    subject: int
+    subject_type: str
+    subject_name: str
+    approval: str
+    spread: int
+    approvals: int
+    remaining: int
+
+
+class ApprovalInboxTModel(TendrilTBaseModel):
+    context: int
+    total: int
+    offset: int
+    limit: Optional[int]
+    items: List[ApprovalInboxItemTModel]
+
+
+class ApprovalBulkTModel(TendrilTBaseModel):
+    subjects: List[int]
+    approval_type: Optional[str]
+
+
+class ApprovalBulkResultTModel(TendrilTBaseModel):
+    subject: int
+    approval: Optional[str]
+    result: str
+    detail: Optional[str]
+
+
 class ApprovalCollector(object):
+    columns = ['subject', 'context', 'approval', 'approved', 'user', 'timestamp']
+
     def __init__(self):
-        self._raw_data = []
+        self._records = []
         self.df = None
 
     def add_approval(self, approval):
         # TODO Dedup?
-        self._raw_data.append({
-            'subject': approval.interest_id,
-            'context': approval.context_id,
-            'approval': approval.approval_type.name,
-            'approved': approval.approved,
-            'user': approval.user.puid,
-            'timestamp': (approval.updated_at or approval.created_at).for_json()
-        })
+        timestamp = approval.updated_at or approval.created_at
+        self._records.append((approval.interest_id, approval.context_id,
+                              approval.approval_type.name, approval.approved,
+                              approval.user.puid, getattr(timestamp, 'datetime', timestamp)))
 
     def add_approvals(self, approvals):
         for approval in approvals:
             self.add_approval(approval)
 
+    def add_records(self, records):
+        # Rows from get_approval_records, in the order of columns
+        self._records.extend(records)
+
     def process(self):
-        self.df = polars.DataFrame(self._raw_data)
+        self.df = polars.DataFrame(self._records, schema=self.columns, orient='row')
+        self._build_index()
+
+    def _build_index(self):
+        # Approvals grouped by (subject, context, approval, approved), built
+        # in a single pass so that lookups do not need to filter the frame.
+        self._index = {}
+        for subject, context, approval, approved, user, timestamp in self.df.iter_rows():
+            self._index.setdefault((subject, context, approval, approved), []).append(
+                {'user': user, 'timestamp': timestamp}
+            )
 
     def apply_approval_filter(self, include_approvals):
         # TODO This will mess with caching!
         self.df = self.df.filter(polars.col('approval').is_in(include_approvals))
+        self._build_index()
 
     def subjects(self):
-        if not self.df.select(polars.count()).item():
-            return []
-        return list(self.df.select(polars.col('subject').unique()).get_column(name='subject'))
+        return list(dict.fromkeys(x[0] for x in self._index.keys()))
 
     def contexts(self, subject=None):
-        if not subject:
-            df = self.df
-        else:
-            df = self.df.filter(polars.col("subject") == subject)
-        if not df.select(polars.count()).item():
-            return []
-        return list(df.select(['context', 'approval']).unique().rows())
+        return list(dict.fromkeys((x[1], x[2]) for x in self._index.keys()
+                                  if not subject or x[0] == subject))
 
     def approvals(self, subject, context, name, approved=True):
-        if not self.df.select(polars.count()).item():
-            return []
-        df = self.df.filter((polars.col("subject") == subject) &
-                            (polars.col("context") == context) &
-                            (polars.col("approval") == name) &
-                            (polars.col("approved") == approved))
-        if not df.select(polars.count()).item():
-            return []
-        return df.select(['user', 'timestamp']).to_dicts()
+        return list(self._index.get((subject, context, name, approved), []))
 
     def render_subject_perspective(self):
-        rv = []
-        for subject in self.subjects():
-            subject_rv = {'subject': subject, 'contexts': []}
-            for context, approval_name in self.contexts(subject=subject):
-                context_rv = {'name': approval_name,
-                              'context': context,
-                              'approvals': self.approvals(subject, context, approval_name),
-                              'rejections': self.approvals(subject, context, approval_name, approved=False)}
-                subject_rv['contexts'].append(context_rv)
-            rv.append(subject_rv)
-        return rv
+        subjects = {}
+        for subject, context, approval, approved in self._index.keys():
+            contexts = subjects.setdefault(subject, {})
+            if (context, approval) not in contexts:
+                contexts[(context, approval)] = {
+                    'name': approval,
+                    'context': context,
+                    'approvals': self.approvals(subject, context, approval),
+                    'rejections': self.approvals(subject, context, approval, approved=False)
+                }
+        return [{'subject': subject, 'contexts': list(contexts.values())}
+                for subject, contexts in subjects.items()]
 
     def render_context_perspective(self):
         return self.render_subject_perspective()
@@ -0,0 +1,265 @@
+
+
+import time
+import json
+import asyncio
+from enum import Enum
+from uuid import uuid4
+from threading import RLock
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.exc import NoResultFound
+
+from tendril.caching import transit
+from tendril.utils.db import with_db
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+_missing = object()
+_hierarchy_listeners = []
+
+
+def register_hierarchy_listener(listener, renames=True):
+    # Listeners which only depend on the structure of the hierarchy, and not
+    # on the names of interests, can opt out of rename signals.
+    _hierarchy_listeners.append((listener, renames))
+    return listener
+
+
+def _dispatch_hierarchy_changed(interest_id=None, renamed=False):
+    logger.debug(f"Hierarchy changed at interest {interest_id}")
+    for listener, renames in _hierarchy_listeners:
+        if renamed and not renames:
+            continue
+        listener(interest_id)
+
+
+def _hierarchy_pending(session):
+    pending = session.info.get('hierarchy_pending')
+    if pending is None:
+        pending = session.info['hierarchy_pending'] = []
+        event.listen(session, 'after_commit', _hierarchy_committed)
+        event.listen(session, 'after_rollback', _hierarchy_rolled_back)
+    return pending
+
+
+def _hierarchy_committed(session):
+    pending = session.info['hierarchy_pending']
+    signals = list(dict.fromkeys(pending))
+    pending.clear()
+    for interest_id, renamed in signals:
+        _dispatch_hierarchy_changed(interest_id, renamed=renamed)
+
+
+def _hierarchy_rolled_back(session):
+    session.info['hierarchy_pending'].clear()
+
+
+def signal_hierarchy_changed(interest_id=None, renamed=False, session=None):
+    # Changes to the hierarchy (new parent / child links, renames of
+    # interests which show up as localizers) may affect any descendant of
+    # the interest, which we generally don't know about here. Listeners
+    # are therefore expected to invalidate broadly. For new links, the
+    # interest is the child, since it is its subtree which is affected.
+    #
+    # When a session is provided, listeners are only called once it
+    # commits, so that caches are not rebuilt from the old hierarchy by
+    # concurrent requests in the meantime. If it is rolled back, the
+    # signal is dropped.
+    if session is None:
+        _dispatch_hierarchy_changed(interest_id, renamed=renamed)
+        return
+    _hierarchy_pending(session).append((interest_id, renamed))
+
+
+class BoundedMemo(object):
+    def __init__(self, maxsize=1024, ttl=None, hierarchy_sensitive=False):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = RLock()
+        if hierarchy_sensitive:
+            register_hierarchy_listener(self._hierarchy_changed)
+
+    def _hierarchy_changed(self, interest_id=None):
+        self.clear()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                value, expires = self._data[key]
+            except KeyError:
+                return default
+            if expires is not None and expires < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            value = self._data.pop(key, None)
+        if value is None:
+            return default
+        return value[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __contains__(self, key):
+        return self.get(key, _missing) is not _missing
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SingleFlight(object):
+    # Collapses concurrent calls with the same key into a single in-flight
+    # coroutine. All callers receive the result (or exception) of that call.
+    def __init__(self):
+        self._inflight = {}
+
+    def _done(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    async def run(self, key, coro_fn):
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._done(key, t))
+        # Shielded, so that a cancelled caller does not cancel the
+        # shared task out from under the others.
+        return await asyncio.shield(task)
+
+
+def _json_default(value):
+    if isinstance(value, Enum):
+        return value.value
+    return str(value)
+
+
+def json_serializer(value):
+    return json.dumps(value, default=_json_default)
+
+
+def _decode(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class SharedHierarchyCache(object):
+    # Hierarchy dependent cache shared across interest instances, and
+    # optionally across processes using the transit cache. Invalidation is
+    # done by changing a generation token. When the transit backend is used,
+    # the token is stored in transit as well, so a hierarchy change in any
+    # process invalidates entries in all of them.
+    #
+    # Values are held in their serialized form in both the local and transit
+    # caches, and deserialized on each get. Callers therefore always get the
+    # same shape, whichever cache served them, and their own copy to modify.
+    def __init__(self, namespace, maxsize=1024, ttl=None, use_transit=False,
+                 ser=json_serializer, deser=json.loads):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.use_transit = use_transit
+        self.ser = ser
+        self.deser = deser
+        self._local = BoundedMemo(maxsize=maxsize, ttl=ttl)
+        self._generation = uuid4().hex
+        register_hierarchy_listener(self.invalidate)
+
+    def _current_generation(self):
+        if not self.use_transit:
+            return self._generation
+        generation = transit.read(namespace=self.namespace, key='generation',
+                                  deser=_decode)
+        if not generation:
+            generation = self._generation
+            transit.write(generation, namespace=self.namespace,
+                          key='generation', ser=str)
+        return generation
+
+    def invalidate(self, interest_id=None):
+        self._local.clear()
+        self._generation = uuid4().hex
+        if self.use_transit:
+            transit.write(self._generation, namespace=self.namespace,
+                          key='generation', ser=str)
+
+    def get(self, key, builder):
+        generation = self._current_generation()
+        local = self._local.get(key)
+        if local is not None and local[0] == generation:
+            return self.deser(local[1])
+        transit_key = f'{generation}:{key}'
+        data = None
+        if self.use_transit:
+            data = transit.read(namespace=self.namespace, key=transit_key,
+                                deser=_decode)
+        if data is None:
+            data = self.ser(builder())
+            if self.use_transit:
+                transit.write(data, namespace=self.namespace, key=transit_key,
+                              ttl=self.ttl, ser=str)
+        self._local.set(key, (generation, data))
+        return self.deser(data)
+
+
+def transit_write_many(writes):
+    # Writes many values to the transit cache in a single round trip. Each
+    # write is a dict of the arguments transit.write accepts, and the results
+    # are returned in the same order, as transit.write would for each. The
+    # transit client has no pipelined API, so this uses its connection
+    # directly.
+    if not writes:
+        return []
+    cache_keys = [transit._common(namespace=x.get('namespace'), key=x.get('key'))
+                  for x in writes]
+    pipeline = transit.redis_connection.pipeline(transaction=False)
+    for cache_key, kwargs in zip(cache_keys, writes):
+        ser = kwargs.get('ser', json.dumps)
+        pipeline.set(cache_key, ser(kwargs.get('value')), ex=kwargs.get('ttl'),
+                     get=kwargs.get('get', False))
+    return pipeline.execute()
+
+
+class NameIdRegistry(object):
+    # Process-wide name to id map for small tables which rarely change, such
+    # as roles and approval and policy types. The whole table is loaded at
+    # once, and reloaded when a name is not found.
+    def __init__(self, model):
+        self.model = model
+        self._ids = {}
+        self._lock = RLock()
+
+    @with_db
+    def load(self, session=None):
+        ids = dict(session.query(self.model.name, self.model.id).all())
+        with self._lock:
+            self._ids = ids
+        logger.debug(f"Loaded {len(ids)} {self.model.__name__} ids")
+
+    def get(self, name, session=None):
+        try:
+            return self._ids[name]
+        except KeyError:
+            pass
+        self.load(session=session)
+        try:
+            return self._ids[name]
+        except KeyError:
+            raise NoResultFound(f"{self.model.__name__} '{name}' not found")
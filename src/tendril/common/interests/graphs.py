@@ -0,0 +1,124 @@
+
+
+import asyncio
+
+from tendril.utils.db import get_session
+from tendril.db.controllers.interests import get_interest
+from tendril.common.interests.caching import BoundedMemo
+from tendril.common.interests.caching import SingleFlight
+
+from tendril.core.topology.grafana.teams import ensure_graphs_team
+from tendril.core.topology.grafana.folders import ensure_graphs_folder
+from tendril.connectors.grafana.actions.dashboards import get_dashboard
+from tendril.connectors.grafana.actions.dashboards import upsert_dashboard
+from tendril.connectors.grafana.models.dashboard import generate_dashboard
+
+from tendril.config import GRAFANA_BASE_URL
+from tendril.config import INTERESTS_GRAPHS_CACHE_SIZE
+from tendril.config import INTERESTS_GRAPHS_CACHE_TTL
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+class GraphsProvisioner(object):
+    # Grafana side state for interest graphs. Team ids and folder uids are
+    # cached per graphs owner, and dashboard urls per dashboard uid, each
+    # with a TTL. Concurrent lookups for the same key are collapsed.
+    #
+    # Missing dashboards can be provisioned in the background, at most once
+    # at a time per dashboard uid. Background jobs reload the interest in
+    # their own session, since the requesting session is generally closed
+    # by the time they run.
+    def __init__(self, maxsize=1024, ttl=300):
+        self._targets = BoundedMemo(maxsize=maxsize, ttl=ttl)
+        self._urls = BoundedMemo(maxsize=maxsize, ttl=ttl)
+        self._flight = SingleFlight()
+        self._provisioning = {}
+
+    async def target(self, owner):
+        key = (owner.type_name, owner.name)
+        target = self._targets.get(key)
+        if target is not None:
+            return target
+        type_name, name, descriptive_name = owner.type_name, owner.name, owner.descriptive_name
+
+        async def _ensure():
+            logger.debug(f"Determining grafana team and folder for {type_name} {name}")
+            team_id = await ensure_graphs_team(interest_type=type_name, interest_name=name)
+            folder_uid = await ensure_graphs_folder(interest_type=type_name, interest_name=name,
+                                                    descriptive_name=descriptive_name)
+            return team_id, folder_uid
+
+        target = await self._flight.run(('target',) + key, _ensure)
+        self._targets.set(key, target)
+        return target
+
+    async def lookup(self, uid):
+        url = self._urls.get(uid)
+        if url is not None:
+            return url
+
+        async def _lookup():
+            logger.debug(f"Searching for dashboard {uid}")
+            return await get_dashboard(uid)
+
+        dashboard_info = await self._flight.run(('dashboard', uid), _lookup)
+        if not dashboard_info:
+            return None
+        url = f"{GRAFANA_BASE_URL}{dashboard_info['meta']['url']}"
+        self._urls.set(uid, url)
+        return url
+
+    async def provision(self, spec, team_id, folder_uid):
+        uid = spec.uid
+        logger.info(f"Generating dashboard {uid}")
+        payload = await generate_dashboard(spec)
+        payload.setdefault('uid', uid)
+        logger.debug(f"Publishing dashboard {uid}")
+        dashboard_info = await upsert_dashboard(
+            payload, team_id=team_id, folder_uid=folder_uid,
+            commit_msg="Generated from spec"
+        )
+        url = GRAFANA_BASE_URL + dashboard_info['url']
+        self._urls.set(uid, url)
+        return url
+
+    def schedule(self, uid, interest_id, spec_name, team_id, folder_uid):
+        task = self._provisioning.get(uid)
+        if task is not None and not task.done():
+            return task
+        task = asyncio.get_running_loop().create_task(
+            self._provision_background(uid, interest_id, spec_name, team_id, folder_uid)
+        )
+        self._provisioning[uid] = task
+        task.add_done_callback(lambda t: self._done(uid, t))
+        return task
+
+    def _done(self, uid, task):
+        if self._provisioning.get(uid) is task:
+            del self._provisioning[uid]
+
+    async def _provision_background(self, uid, interest_id, spec_name, team_id, folder_uid):
+        from tendril.interests import type_codes
+        try:
+            with get_session() as session:
+                model = get_interest(id=interest_id, session=session)
+                interest = type_codes[model.type_name](model)
+                for spec_class in interest.graphs_specs:
+                    spec = spec_class(actual=interest)
+                    if spec.name == spec_name:
+                        await self.provision(spec, team_id, folder_uid)
+                        break
+        except Exception as e:
+            logger.error(f"Could not provision dashboard {uid} for interest {interest_id} : {e}")
+
+    async def drain(self):
+        if self._provisioning:
+            await asyncio.gather(*self._provisioning.values(), return_exceptions=True)
+
+
+graphs_provisioner = GraphsProvisioner(
+    maxsize=INTERESTS_GRAPHS_CACHE_SIZE,
+    ttl=INTERESTS_GRAPHS_CACHE_TTL,
+)
@@ -38,6 +38,253 @@ config_elements_interests = [
         "variables.",
         parser=bool
     ),
+    ConfigOption(
+        'INTERESTS_MONITORS_PUBLISH_BATCHED',
+        "False",
+        "Whether monitor datapoints are published to the message queue in batches. "
+        "When enabled, datapoints are buffered per routing key and published as a "
+        "single message containing a list of datapoints. Consumers of the 'im.#' "
+        "topic must be able to accept both single datapoints and lists of them.",
+        parser=bool
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_PUBLISH_BATCH_SIZE',
+        "100",
+        "Maximum number of datapoints buffered per routing key before a batch "
+        "is published.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_PUBLISH_BATCH_DELAY',
+        "10",
+        "Maximum time in milliseconds a datapoint is held in the publish buffer "
+        "before the batch is published.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_PUBLISH_LOC_CACHE_SIZE',
+        "4096",
+        "Maximum number of monitor publish locations (measurement and base tags) "
+        "memoized per process. The memo is cleared whenever the interest "
+        "hierarchy changes within the process.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_PUBLISH_LOC_CACHE_TTL',
+        "300",
+        "Time in seconds for which memoized monitor publish locations are "
+        "retained. This bounds how long hierarchy changes made by other "
+        "processes take to show up in published tags.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_HEARTBEAT_ENABLED',
+        "True",
+        "Whether the monitors heartbeat scheduler is started with the API "
+        "server. When several workers run it, a lease in the transit cache "
+        "ensures that only one of them publishes heartbeats at a time.",
+        parser=bool
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_HEARTBEAT_INTERVAL',
+        "60",
+        "Interval in seconds at which the monitors heartbeat scheduler checks for "
+        "periodic monitors which are due to be republished.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_DISCOVERY_CONCURRENCY',
+        "8",
+        "Maximum number of concurrent key discovery queries issued for wildcard "
+        "monitors by a single historical monitors request.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_DISCOVERY_CACHE_SIZE',
+        "1024",
+        "Maximum number of wildcard monitor key discovery results cached per "
+        "process.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_DISCOVERY_CACHE_TTL',
+        "60",
+        "Time in seconds for which the keys discovered for wildcard monitors are "
+        "cached for each interest, monitor target and time span. Open ended time "
+        "spans are aligned to buckets of this length.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_HISTORICAL_CACHE_SIZE',
+        "512",
+        "Maximum number of historical monitor query results cached per process.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_HISTORICAL_HEAD_TTL',
+        "15",
+        "Time in seconds for which historical monitor query results including the "
+        "open head of the time series are cached. Such queries are also aligned to "
+        "buckets of this length.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_HISTORICAL_CLOSED_TTL',
+        "86400",
+        "Time in seconds for which historical monitor query results for windows "
+        "which closed in the past are cached.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_STREAM_QUEUE_SIZE',
+        "100",
+        "Maximum number of datapoints held for each connected live monitor stream "
+        "client. Datapoints for clients which fall further behind are dropped.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_INGEST_ENABLED',
+        "False",
+        "Whether monitor reports are written through the ingest pipeline. When "
+        "enabled, API handlers only enqueue monitor writes, which are then "
+        "processed in batches by a fixed pool of ingest workers.",
+        parser=bool
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_INGEST_QUEUE_SIZE',
+        "10000",
+        "Maximum number of monitor writes waiting in the ingest queue. Writes "
+        "received when the queue is full are dropped.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_INGEST_WORKERS',
+        "4",
+        "Number of monitor ingest workers per process.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_INGEST_BATCH_SIZE',
+        "100",
+        "Maximum number of monitor writes processed together by an ingest worker.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_INGEST_SHED_THRESHOLD',
+        "0.8",
+        "Fraction of the ingest queue size beyond which writes for less "
+        "important monitors are shed.",
+        parser=float
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_INGEST_SHED_LEVEL',
+        "NORMAL",
+        "Name of the monitor export level above which monitor writes are shed "
+        "when the ingest queue is beyond the shed threshold.",
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_TIMESTAMP_POLICY',
+        "legacy",
+        "How monitor datapoint timestamps are converted to ns for storage. "
+        "'legacy' converts datetimes through INTERESTS_MONITORS_LOCAL_TZ as "
+        "was done earlier, 'utc' converts them directly using exact integer "
+        "arithmetic.",
+    ),
+    ConfigOption(
+        'INTERESTS_MONITORS_LOCAL_TZ',
+        "Asia/Kolkata",
+        "Timezone used for monitor timestamps by the legacy timestamp policy.",
+    ),
+    ConfigOption(
+        'INTERESTS_APPROVALS_STATUS_CACHE_SIZE',
+        "4096",
+        "Maximum number of interests for which pending approval requirements "
+        "are held in the in-process approval status cache.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_APPROVALS_STATUS_CACHE_TTL',
+        "300",
+        "Time in seconds for which cached pending approval requirements are "
+        "retained. Approval signals and hierarchy changes within the process "
+        "invalidate them earlier.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_APPROVALS_DEFERRED_ACTIVATION',
+        "False",
+        "Whether activation of interests is re-evaluated in the background "
+        "after approvals are granted or withdrawn, instead of within the "
+        "request making the change.",
+        parser=bool
+    ),
+    ConfigOption(
+        'INTERESTS_APPROVALS_ACTIVATION_BATCH_SIZE',
+        "50",
+        "Maximum number of interests re-evaluated for activation together by "
+        "the deferred activation evaluator.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_APPROVALS_ACTIVATION_DELAY',
+        "100",
+        "Time in milliseconds the deferred activation evaluator waits before "
+        "each batch, so that repeated signals for the same interest are "
+        "collapsed.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_POLICIES_MATERIALIZED',
+        "False",
+        "Whether effective (resolved, including inherited) policies are "
+        "materialized in the database. When enabled, setting a policy "
+        "recomputes the effective policy for the interest's subtree, and "
+        "policy reads are served from the materialized policies.",
+        parser=bool
+    ),
+    ConfigOption(
+        'INTERESTS_GRAPHS_CACHE_SIZE',
+        "1024",
+        "Maximum number of grafana team / folder targets and dashboard urls "
+        "cached for interest graphs.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_GRAPHS_CACHE_TTL',
+        "300",
+        "Time in seconds for which grafana team ids, folder uids and dashboard "
+        "urls for interest graphs are cached.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_GRAPHS_PROVISION_BACKGROUND',
+        "True",
+        "Whether missing grafana dashboards for interest graphs are generated "
+        "and published in the background. When enabled, graphs for dashboards "
+        "which are still being provisioned are omitted from the response.",
+        parser=bool
+    ),
+    ConfigOption(
+        'INTERESTS_LOCALIZERS_CACHE_SIZE',
+        "4096",
+        "Maximum number of interest localizer maps held in the in-process "
+        "localizer cache.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_LOCALIZERS_CACHE_TTL',
+        "300",
+        "Time in seconds for which cached interest localizers are retained.",
+        parser=int
+    ),
+    ConfigOption(
+        'INTERESTS_LOCALIZERS_CACHE_TRANSIT',
+        "False",
+        "Whether the interest localizer cache is shared across processes using "
+        "the transit cache. When enabled, hierarchy changes in any process "
+        "invalidate the cache in all processes.",
+        parser=bool
+    ),
 ]
 
 
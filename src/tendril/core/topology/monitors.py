@@ -9,4 +9,6 @@ logger = log.get_logger(__name__)
 @with_mq_client()
 async def create_mq_topology(mq=None):
     logger.info("Creating the Interest Monitors storage worker queue.")
+    # Messages on this queue are either a single datapoint or, when batched
+    # publishing is enabled, a list of datapoints for the same routing key.
     monitor_publish_queue = await mq.create_work_queue('monitors_raw', topic='im.#')
@@ -1,5 +1,10 @@
 
 
+from sqlalchemy import or_
+from sqlalchemy import and_
+from sqlalchemy import select
+from sqlalchemy import exists
+from sqlalchemy import literal
 from sqlalchemy.orm.exc import NoResultFound
 from tendril.utils.db import with_db
 
@@ -14,10 +19,13 @@ from tendril.db.models.interests import InterestLogEntryModel
 
 from tendril.common.interests.exceptions import InterestAlreadyExists
 from tendril.common.interests.exceptions import InterestNotFound
+from tendril.common.interests.caching import NameIdRegistry
 
 from tendril.utils import log
 logger = log.get_logger(__name__)
 
+interest_role_ids = NameIdRegistry(InterestRoleModel)
+
 
 @with_db
 def get_interest_role(name, session=None):
@@ -45,8 +53,7 @@ def preprocess_role(role, session=None):
     if isinstance(role, int):
         return role
     elif isinstance(role, str):
-        role = get_interest_role(role, session=session)
-        return role.id
+        return interest_role_ids.get(role, session=session)
     elif isinstance(role, InterestRoleModel):
         return role.id
 
@@ -65,11 +72,13 @@ def _type_discriminator(type):
 
 
 @with_db
-def get_interests(type=None, state=None, session=None):
+def get_interests(type=None, state=None, ids=None, session=None):
     filters = []
     qmodel = _type_discriminator(type)
     if state:
         filters.append(qmodel.status == state)
+    if ids is not None:
+        filters.append(qmodel.id.in_(ids))
     q = session.query(qmodel).filter(*filters)
     return q.all()
 
@@ -306,6 +315,111 @@ def get_children(interest, type=None, child_type=None, limited=None, session=Non
     return q.filter(*filters).all()
 
 
+def _descendants_cte(interest_id):
+    descendants = select(InterestAssociationModel.child_id.label('id'))\
+        .where(InterestAssociationModel.parent_id == interest_id)\
+        .cte(name='descendants', recursive=True)
+    return descendants.union(
+        select(InterestAssociationModel.child_id)
+        .join(descendants, InterestAssociationModel.parent_id == descendants.c.id)
+    )
+
+
+@with_db
+def get_subtree_links(interest, session=None):
+    # All parent-child links below the interest in a single recursive query,
+    # as rows of (parent id, child id, child type).
+    interest_id = preprocess_interest(interest, session=session)
+    links = select(InterestAssociationModel.parent_id, InterestAssociationModel.child_id)\
+        .where(InterestAssociationModel.parent_id == interest_id)\
+        .cte(name='subtree', recursive=True)
+    links = links.union(
+        select(InterestAssociationModel.parent_id, InterestAssociationModel.child_id)
+        .join(links, InterestAssociationModel.parent_id == links.c.child_id)
+    )
+    q = session.query(links.c.parent_id, links.c.child_id, InterestModel.type)\
+        .join(InterestModel, InterestModel.id == links.c.child_id)
+    return q.all()
+
+
+@with_db
+def get_descendants(interest, types=None, state=None, session=None):
+    # All descendants of the interest in a single recursive query.
+    interest_id = preprocess_interest(interest, session=session)
+    descendants = _descendants_cte(interest_id)
+    filters = [InterestModel.id.in_(select(descendants.c.id))]
+    if types is not None:
+        filters.append(InterestModel.type.in_(types))
+    if state:
+        filters.append(InterestModel.status == state)
+    q = session.query(InterestModel).filter(*filters).order_by(InterestModel.id)
+    return q.all()
+
+
+def _ancestors_cte(interest_id, limited=None, max_depth=64):
+    base = select(InterestAssociationModel.parent_id.label('id'),
+                  InterestAssociationModel.child_id.label('child_id'),
+                  literal(1).label('depth'))\
+        .where(InterestAssociationModel.child_id == interest_id)
+    if limited is not None:
+        base = base.where(InterestAssociationModel.limited == limited)
+    ancestors = base.cte(name='ancestors', recursive=True)
+    step = select(InterestAssociationModel.parent_id,
+                  InterestAssociationModel.child_id,
+                  ancestors.c.depth + 1)\
+        .join(ancestors, InterestAssociationModel.child_id == ancestors.c.id)\
+        .where(ancestors.c.depth < max_depth)
+    if limited is not None:
+        step = step.where(InterestAssociationModel.limited == limited)
+    return ancestors.union(step)
+
+
+@with_db
+def get_ancestor_links(interest, limited=None, session=None):
+    # All parent links above the interest in a single recursive query, as
+    # rows of (ancestor id, ancestor type, child id, depth), ordered by depth.
+    interest_id = preprocess_interest(interest, session=session)
+    ancestors = _ancestors_cte(interest_id, limited=limited)
+    q = session.query(ancestors.c.id, InterestModel.type,
+                      ancestors.c.child_id, ancestors.c.depth)\
+        .join(InterestModel, InterestModel.id == ancestors.c.id)\
+        .order_by(ancestors.c.depth)
+    return q.all()
+
+
+@with_db
+def get_ancestor_ids(interest, limited=None, session=None):
+    # Ancestor ids, nearest first.
+    rv = {}
+    for ancestor_id, _, _, depth in get_ancestor_links(interest, limited=limited, session=session):
+        rv.setdefault(ancestor_id, depth)
+    return list(rv.keys())
+
+
+@with_db
+def has_parent(interest, limited=None, session=None):
+    interest_id = preprocess_interest(interest, session=session)
+    filters = [InterestAssociationModel.child_id == interest_id]
+    if limited is not None:
+        filters.append(InterestAssociationModel.limited == limited)
+    return session.query(exists().where(*filters)).scalar()
+
+
+@with_db
+def has_role_users(candidates, session=None):
+    # candidates is a dict of {interest id: role names}. Checks whether any
+    # user holds any of the roles on the corresponding interest.
+    clauses = [and_(InterestMembershipModel.interest_id == interest_id,
+                    InterestRoleModel.name.in_(list(roles)))
+               for interest_id, roles in candidates.items() if roles]
+    if not clauses:
+        return False
+    q = session.query(InterestMembershipModel)\
+        .join(InterestRoleModel, InterestRoleModel.id == InterestMembershipModel.role_id)\
+        .filter(or_(*clauses))
+    return session.query(q.exists()).scalar()
+
+
 @with_db
 def get_artefacts():
     pass
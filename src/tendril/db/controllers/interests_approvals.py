@@ -1,14 +1,22 @@
 
 
+from sqlalchemy import func
+from sqlalchemy import DateTime
+from sqlalchemy import type_coerce
 from sqlalchemy.exc import NoResultFound
+from tendril.authn.db.model import User
 from tendril.db.controllers.interests import preprocess_user
 from tendril.db.controllers.interests import preprocess_interest
 from tendril.db.controllers.interests import get_interest_role
 from tendril.db.models.interests_approvals import ApprovalTypeModel
 from tendril.db.models.interests_approvals import InterestApprovalModel
+from tendril.common.interests.caching import NameIdRegistry
 from tendril.utils.db import with_db
 
 
+approval_type_ids = NameIdRegistry(ApprovalTypeModel)
+
+
 @with_db
 def get_approval_type(name, session=None):
     q = session.query(ApprovalTypeModel).filter_by(name=name)
@@ -37,15 +45,14 @@ def register_approval_type(approval_type, session=None):
 def preprocess_approval_type(approval_type, session=None):
     if isinstance(approval_type, int):
         return approval_type
-    if not isinstance(approval_type, ApprovalTypeModel):
-        if not isinstance(approval_type, str):
-            approval_type = approval_type.name
-        approval_type = get_approval_type(approval_type, session=session)
-    return approval_type.id
+    if isinstance(approval_type, ApprovalTypeModel):
+        return approval_type.id
+    if not isinstance(approval_type, str):
+        approval_type = approval_type.name
+    return approval_type_ids.get(approval_type, session=session)
 
 
-@with_db
-def get_approval(approval_type=None, context=None, subject=None, user=None, session=None):
+def _approval_filters(approval_type=None, context=None, subject=None, user=None, session=None):
     filters = []
 
     if approval_type:
@@ -60,6 +67,13 @@ def get_approval(approval_type=None, context=None, subject=None, user=None, sess
     if user:
         user = preprocess_user(user, session=session)
         filters.append(InterestApprovalModel.user_id == user)
+    return filters
+
+
+@with_db
+def get_approval(approval_type=None, context=None, subject=None, user=None, session=None):
+    filters = _approval_filters(approval_type=approval_type, context=context,
+                                subject=subject, user=user, session=session)
 
     if len(filters) == 4:
         one = True
@@ -72,6 +86,31 @@ def get_approval(approval_type=None, context=None, subject=None, user=None, sess
     else:
         return q.all()
 
+@with_db
+def get_approval_records(approval_type=None, context=None, subject=None, user=None,
+                         subjects=None, session=None):
+    # Lean projection of approvals for read paths, with the approval type name
+    # and user puid joined in. Returns rows of
+    #   (subject, context, approval, approved, user, timestamp)
+    # without loading any ORM objects or relationships.
+    filters = _approval_filters(approval_type=approval_type, context=context,
+                                subject=subject, user=user, session=session)
+    if subjects is not None:
+        filters.append(InterestApprovalModel.interest_id.in_(subjects))
+    timestamp = type_coerce(func.coalesce(InterestApprovalModel.updated_at,
+                                          InterestApprovalModel.created_at),
+                            DateTime(timezone=True))
+    q = session.query(InterestApprovalModel.interest_id,
+                      InterestApprovalModel.context_id,
+                      ApprovalTypeModel.name,
+                      InterestApprovalModel.approved,
+                      User.puid,
+                      timestamp)
+    q = q.join(ApprovalTypeModel, ApprovalTypeModel.id == InterestApprovalModel.approval_type_id)
+    q = q.join(User, User.id == InterestApprovalModel.user_id)
+    return q.filter(*filters).all()
+
+
 @with_db
 def register_approval(approval_type, context, subject, user, reject=False, session=None):
     approval_type = preprocess_approval_type(approval_type, session=session)
@@ -102,6 +141,49 @@ def register_approval(approval_type, context, subject, user, reject=False, sessi
     session.flush()
     return new_approval
 
+@with_db
+def register_approvals(approvals, user, reject=False, session=None):
+    # approvals is an iterable of (approval_type, context, subject). Existing
+    # approvals by the user are found in a single query, and the new ones are
+    # inserted together. Returns the new approvals, and the combinations which
+    # were skipped because the user has already approved or rejected them.
+    user = preprocess_user(user, session=session)
+    approvals = list(approvals)
+    approval_types = {x[0]: preprocess_approval_type(x[0], session=session)
+                      for x in approvals}
+    approvals = [(approval_types[approval_type],
+                  preprocess_interest(context, session=session),
+                  preprocess_interest(subject, session=session))
+                 for approval_type, context, subject in approvals]
+    if not approvals:
+        return [], []
+
+    q = session.query(InterestApprovalModel.approval_type_id,
+                      InterestApprovalModel.context_id,
+                      InterestApprovalModel.interest_id)
+    q = q.filter(InterestApprovalModel.user_id == user,
+                 InterestApprovalModel.interest_id.in_({x[2] for x in approvals}))
+    existing = {tuple(x) for x in q.all()}
+
+    new_approvals, skipped = [], []
+    for approval_type, context, subject in approvals:
+        if (approval_type, context, subject) in existing:
+            skipped.append((approval_type, context, subject))
+            continue
+        existing.add((approval_type, context, subject))
+        new_approvals.append(InterestApprovalModel(
+            approval_type_id=approval_type,
+            context_id=context,
+            interest_id=subject,
+            user_id=user,
+            approved=not reject
+        ))
+
+    session.add_all(new_approvals)
+    session.flush()
+    return new_approvals, skipped
+
+
 @with_db
 def withdraw_approval(approval_type, context, subject, user, session=None):
     approval_type = preprocess_approval_type(approval_type, session=session)
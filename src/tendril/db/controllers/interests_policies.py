@@ -1,14 +1,28 @@
 
 
+from collections import deque
+from sqlalchemy import select
+from sqlalchemy import delete
+from sqlalchemy import literal
+from sqlalchemy import union_all
 from sqlalchemy.exc import NoResultFound
+from sqlalchemy.dialects.postgresql import insert
 from tendril.db.controllers.interests import preprocess_user
 from tendril.db.controllers.interests import preprocess_interest
+from tendril.db.controllers.interests import _ancestors_cte
+from tendril.db.controllers.interests import _descendants_cte
+from tendril.db.controllers.interests import get_subtree_links
 
 from tendril.db.models.interests_policies import PolicyTypeModel
 from tendril.db.models.interests_policies import InterestPolicyModel
+from tendril.db.models.interests_policies import InterestEffectivePolicyModel
+from tendril.common.interests.caching import NameIdRegistry
 from tendril.utils.db import with_db
 
 
+policy_type_ids = NameIdRegistry(PolicyTypeModel)
+
+
 @with_db
 def get_policy_type(name, session=None):
     q = session.query(PolicyTypeModel).filter_by(name=name)
@@ -32,11 +46,11 @@ def register_policy_type(policy_type, session=None):
 def preprocess_policy_type(policy_type, session=None):
     if isinstance(policy_type, int):
         return policy_type
-    if not isinstance(policy_type, PolicyTypeModel):
-        if not isinstance(policy_type, str):
-            policy_type = policy_type.name
-        policy_type = get_policy_type(policy_type, session=session)
-    return policy_type.id
+    if isinstance(policy_type, PolicyTypeModel):
+        return policy_type.id
+    if not isinstance(policy_type, str):
+        policy_type = policy_type.name
+    return policy_type_ids.get(policy_type, session=session)
 
 @with_db
 def get_policy(policy_type=None, interest=None, user=None, required=False, session=None):
@@ -69,6 +83,28 @@ def get_policy(policy_type=None, interest=None, user=None, required=False, sessi
         raise
 
 
+@with_db
+def get_policy_chain(interest, policy_types=None, session=None):
+    # Policies defined on the interest and all its ancestors in a single
+    # query, as rows of (interest id, depth, policy type name, policy),
+    # nearest first. The interest itself is at depth 0.
+    interest_id = preprocess_interest(interest, session=session)
+    ancestors = _ancestors_cte(interest_id)
+    levels = union_all(
+        select(literal(interest_id).label('id'), literal(0).label('depth')),
+        select(ancestors.c.id, ancestors.c.depth)
+    ).subquery('levels')
+
+    q = session.query(levels.c.id, levels.c.depth,
+                      PolicyTypeModel.name, InterestPolicyModel.policy)\
+        .select_from(levels)\
+        .join(InterestPolicyModel, InterestPolicyModel.interest_id == levels.c.id)\
+        .join(PolicyTypeModel, PolicyTypeModel.id == InterestPolicyModel.policy_type_id)
+    if policy_types is not None:
+        q = q.filter(PolicyTypeModel.name.in_(policy_types))
+    return q.order_by(levels.c.depth).all()
+
+
 @with_db
 def upsert_policy(policy_type, interest, user, policy, session=None):
     policy_type = preprocess_policy_type(policy_type, session=session)
@@ -110,3 +146,110 @@ def clear_policy(policy_type, interest, session=None):
         return existing
     except NoResultFound:
         pass
+
+
+@with_db
+def get_effective_policies(interests, policy_types=None, session=None):
+    # Materialized effective policies for many interests, as rows of
+    # (interest id, policy type name, policy, source interest id).
+    q = session.query(InterestEffectivePolicyModel.interest_id,
+                      PolicyTypeModel.name,
+                      InterestEffectivePolicyModel.policy,
+                      InterestEffectivePolicyModel.source_interest_id)\
+        .join(PolicyTypeModel, PolicyTypeModel.id == InterestEffectivePolicyModel.policy_type_id)\
+        .filter(InterestEffectivePolicyModel.interest_id.in_(interests))
+    if policy_types is not None:
+        q = q.filter(PolicyTypeModel.name.in_(policy_types))
+    return q.all()
+
+
+@with_db
+def write_effective_policies(policies, overwrite=True, session=None):
+    # policies is an iterable of (interest id, policy type, source interest id,
+    # policy), written in a single statement. Without overwrite, existing
+    # rows are left as they are.
+    values = [{'interest_id': interest_id,
+               'policy_type_id': preprocess_policy_type(policy_type, session=session),
+               'source_interest_id': source,
+               'policy': policy}
+              for interest_id, policy_type, source, policy in policies]
+    if not values:
+        return
+    stmt = insert(InterestEffectivePolicyModel).values(values)
+    if overwrite:
+        stmt = stmt.on_conflict_do_update(
+            index_elements=['interest_id', 'policy_type_id'],
+            set_={'source_interest_id': stmt.excluded.source_interest_id,
+                  'policy': stmt.excluded.policy}
+        )
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=['interest_id', 'policy_type_id'])
+    session.execute(stmt)
+
+
+@with_db
+def clear_effective_policies(interest=None, session=None):
+    # Removes materialized policies for the interest and all its descendants,
+    # or all of them if no interest is given.
+    stmt = delete(InterestEffectivePolicyModel)
+    if interest is not None:
+        interest_id = preprocess_interest(interest, session=session)
+        descendants = _descendants_cte(interest_id)
+        stmt = stmt.where(InterestEffectivePolicyModel.interest_id.in_(
+            select(descendants.c.id).union(select(literal(interest_id)))
+        ))
+    session.execute(stmt)
+
+
+@with_db
+def materialize_effective_policy(interest, interest_type, policy_type,
+                                 inheriting_types, session=None):
+    # Recomputes the effective policy of one type for the interest and its
+    # subtree. The nearest definition above the interest and the subtree
+    # links are fetched in one recursive query each, the definitions within
+    # the subtree in one more, and the results are written together.
+    # Interests whose type is not in inheriting_types only take their own
+    # definitions, but still pass inherited definitions on to descendants.
+    # Where an interest has more than one parent within the subtree, the
+    # one closest to the root of the subtree is used.
+    interest_id = preprocess_interest(interest, session=session)
+    links = get_subtree_links(interest_id, session=session)
+
+    types = {interest_id: interest_type}
+    children = {}
+    for parent_id, child_id, child_type in links:
+        children.setdefault(parent_id, []).append(child_id)
+        types[child_id] = child_type
+
+    inherited = None
+    for source, depth, _, policy in get_policy_chain(interest_id, policy_types=[policy_type],
+                                                     session=session):
+        if depth:
+            inherited = (source, policy)
+            break
+
+    q = session.query(InterestPolicyModel.interest_id, InterestPolicyModel.policy)\
+        .filter(InterestPolicyModel.policy_type_id ==
+                preprocess_policy_type(policy_type, session=session),
+                InterestPolicyModel.interest_id.in_(list(types.keys())))
+    own = dict(q.all())
+
+    rows, seen = [], set()
+    pending = deque([(interest_id, inherited)])
+    while pending:
+        current, inherited = pending.popleft()
+        if current in seen:
+            continue
+        seen.add(current)
+        if current in own:
+            nearest = effective = (current, own[current])
+        else:
+            nearest = inherited
+            effective = inherited if types[current] in inheriting_types else None
+        source, policy = effective or (None, None)
+        rows.append((current, policy_type, source, policy))
+        for child_id in children.get(current, []):
+            pending.append((child_id, nearest))
+
+    write_effective_policies(rows, session=session)
+    return len(rows)
@@ -37,3 +37,15 @@ class InterestPolicyModel(DeclBase, BaseMixin, UserMixin, TimestampMixin):
     __table_args__ = (
         UniqueConstraint('interest_id', 'policy_type_id'),
     )
+
+
+class InterestEffectivePolicyModel(DeclBase, BaseMixin, TimestampMixin):
+    # Materialized result of policy resolution for an interest, including
+    # policies inherited from ancestors. A null policy records that no
+    # policy applies. Only maintained when INTERESTS_POLICIES_MATERIALIZED
+    # is enabled.
+    id = None
+    interest_id: Mapped[int] = mapped_column(ForeignKey('Interest.id'), primary_key=True)
+    policy_type_id = Column(Integer, ForeignKey('PolicyType.id'), primary_key=True)
+    source_interest_id: Mapped[int] = mapped_column(ForeignKey('Interest.id'), nullable=True)
+    policy = Column(mutable_json_type(dbtype=JSONB))
@@ -7,3 +7,8 @@ _manager = InterestManager(prefix='tendril.interests')
 import sys
 sys.modules[__name__] = _manager
 _manager.finalize()
+
+# Policy specs depend on the interest hierarchy, and are rendered once it is
+# available.
+from tendril import policies
+policies.render_specs()
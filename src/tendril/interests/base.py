@@ -18,6 +18,7 @@ from tendril.common.interests.exceptions import RequiredRoleNotPresent
 from tendril.common.interests.exceptions import RequiredParentNotPresent
 from tendril.common.interests.exceptions import ActivationNotAllowedFromState
 from tendril.common.interests.exceptions import AuthorizationRequiredError
+from tendril.common.interests.caching import signal_hierarchy_changed
 
 from tendril.db.controllers.interests import get_interest
 from tendril.db.controllers.interests import upsert_interest
@@ -29,6 +30,9 @@ from tendril.db.controllers.interests import remove_user
 from tendril.db.controllers.interests import add_child
 from tendril.db.controllers.interests import get_children
 from tendril.db.controllers.interests import get_parents
+from tendril.db.controllers.interests import get_ancestor_links
+from tendril.db.controllers.interests import has_parent
+from tendril.db.controllers.interests import has_role_users
 
 from tendril.authz.roles.interests import require_state
 from tendril.authz.roles.interests import require_permission
@@ -41,6 +45,10 @@ from tendril.utils.db import with_db
 from tendril.utils import log
 logger = log.get_logger(__name__)
 
+# Fields which appear in the localizers of descendant interests. Changes to
+# these are signalled as renames.
+_localizer_fields = ('name', 'descriptive_name')
+
 
 class InterestBaseCreateTModel(TendrilTBaseModel):
     name: str = Field(..., max_length=255)
@@ -111,15 +119,22 @@ class InterestBase(InterestExportMixin):
     def set_descriptive_name(self, value, session=None):
         self._descriptive_name = value
         self._commit_to_db(session=session)
+        signal_hierarchy_changed(self.id, renamed=True, session=session)
 
     @with_db
     @require_permission('edit', strip_auth=False, required=False)
     def edit(self, changes, auth_user=None, session=None):
+        renamed = False
         for field_name in changes.__fields__:
             value = getattr(changes, field_name)
             if value and hasattr(self.model_instance, field_name):
+                if field_name in _localizer_fields and \
+                        getattr(self.model_instance, field_name) != value:
+                    renamed = True
                 setattr(self.model_instance, field_name, value)
         session.add(self.model_instance)
+        if renamed:
+            signal_hierarchy_changed(self.id, renamed=True, session=session)
 
     @property
     def ident(self):
@@ -181,11 +196,10 @@ class InterestBase(InterestExportMixin):
         if self.status not in self.model.role_spec.activation_requirements['allowed_states']:
             raise ActivationNotAllowedFromState(self.status, self.id, self.name)
         for role in self.model.role_spec.activation_requirements['roles_required']:
-            users = self.get_role_accepted_users(role, session=session)
-            if not len(users):
+            if not self.has_role_accepted_users(role, session=session):
                 raise RequiredRoleNotPresent(role, self.id, self.name)
         if self.model.role_spec.activation_requirements['parent_required']:
-            if not len(self.parents(limited=False, session=session)):
+            if not has_parent(self.id, limited=False, session=session):
                 raise RequiredParentNotPresent(self.id, self.name)
 
     @property
@@ -306,6 +320,33 @@ class InterestBase(InterestExportMixin):
     def get_role_accepted_users(self, role, session=None):
         return self.memberships(role=role, session=session)
 
+    @with_db
+    def has_role_accepted_users(self, role, session=None):
+        # Equivalent to checking for any get_role_accepted_users, without
+        # building the memberships. The interests whose memberships would be
+        # inherited are found from a single ancestors query, and the
+        # memberships are then probed together.
+        from tendril.interests import type_codes
+        role_spec = self.model.role_spec
+        candidates = {self.id: set(role_spec.get_accepted_roles(role))}
+        if role_spec.inherits_from_parent:
+            parents = {}
+            for parent_id, parent_type, child_id, _ in \
+                    get_ancestor_links(self.id, limited=False, session=session):
+                parents.setdefault(child_id, set()).add((parent_id, parent_type))
+            pending, seen = [self.id], {self.id}
+            while pending:
+                for parent_id, parent_type in parents.get(pending.pop(), []):
+                    parent_spec = type_codes[parent_type].model.role_spec
+                    if role not in parent_spec.roles:
+                        continue
+                    candidates.setdefault(parent_id, set()).update(
+                        parent_spec.get_accepted_roles(role))
+                    if parent_spec.inherits_from_parent and parent_id not in seen:
+                        seen.add(parent_id)
+                        pending.append(parent_id)
+        return has_role_users(candidates, session=session)
+
     @with_db
     def check_user_access(self, user, action, session=None):
         if hasattr(user, 'id'):
@@ -438,8 +479,10 @@ class InterestBase(InterestExportMixin):
     @require_state(LifecycleStatus.ACTIVE)
     @require_permission('add_child', specifier=_get_child_type, preprocessor=normalize_type_name)
     def add_child(self, child, limited=False, session=None):
-        return add_child(child, self.id, self.type_name,
-                         limited=limited, session=session)
+        rv = add_child(child, self.id, self.type_name,
+                       limited=limited, session=session)
+        signal_hierarchy_changed(rv.child_id, session=session)
+        return rv
 
     @with_db
     def add_artefact(self, artefact, session=None):
@@ -34,6 +34,8 @@ from tendril.utils.versions import get_namespace_package_names
 
 from tendril.db.controllers.interests import register_interest_role
 from tendril.db.controllers.interests_approvals import register_approval_type
+from tendril.db.controllers.interests import interest_role_ids
+from tendril.db.controllers.interests_approvals import approval_type_ids
 from tendril.authz.approvals.interests import ApprovalRequirement
 from tendril.common.interests.representations import ExportLevel
 
@@ -95,6 +97,7 @@ class InterestManager(object):
     def commit_interest_roles(self, session=None):
         for name, doc in self._roles.items():
             register_interest_role(name, doc, session=session)
+        interest_role_ids.load(session=session)
 
     def register_approval_type(self, approval_type: ApprovalRequirement):
         logger.info(f"Registering Interest Approval Type '{approval_type.name}'")
@@ -112,6 +115,7 @@ class InterestManager(object):
     def commit_approval_types(self, session=None):
         for name, approval_type in self._approval_types.items():
             register_approval_type(approval_type, session=session)
+        approval_type_ids.load(session=session)
 
     @property
     def types(self):
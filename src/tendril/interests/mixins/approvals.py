@@ -13,12 +13,24 @@ from tendril.authz.approvals.interests import ApprovalRequirement
 from tendril.common.interests.approvals import ApprovalCollector
 
 from tendril.common.interests.exceptions import ActivationError
+from tendril.common.interests.exceptions import InterestStateException
+from tendril.common.interests.exceptions import AuthorizationRequiredError
 from tendril.db.models.interests_approvals import InterestApprovalModel
 from tendril.db.controllers.interests import get_interest
-from tendril.db.controllers.interests_approvals import get_approval
+from tendril.db.controllers.interests import get_descendants
+from tendril.db.controllers.interests import get_ancestor_links
+from tendril.db.controllers.interests import get_interests
+from tendril.db.controllers.interests_approvals import get_approval_records
 from tendril.db.controllers.interests_approvals import register_approval
+from tendril.db.controllers.interests_approvals import register_approvals
 from tendril.db.controllers.interests_approvals import withdraw_approval
 from tendril.common.interests.representations import ExportLevel
+from tendril.common.interests.caching import BoundedMemo
+from tendril.common.interests.activation import activation_evaluator
+
+from tendril.config import INTERESTS_APPROVALS_STATUS_CACHE_SIZE
+from tendril.config import INTERESTS_APPROVALS_STATUS_CACHE_TTL
+from tendril.config import INTERESTS_APPROVALS_DEFERRED_ACTIVATION
 
 from .base import InterestMixinBase
 
@@ -26,6 +38,15 @@ from tendril.utils.db import with_db
 from tendril.utils import log
 logger = log.get_logger(__name__)
 
+# Pending approval requirements per interest id, used only for the
+# has_required_approvals flag in exports. Cleared for an interest by its
+# approval signals, and entirely on any hierarchy change. Approvals made in
+# other processes are only seen once the entry expires, so activation
+# decisions always evaluate pending approvals afresh.
+_approvals_pending_memo = BoundedMemo(maxsize=INTERESTS_APPROVALS_STATUS_CACHE_SIZE,
+                                      ttl=INTERESTS_APPROVALS_STATUS_CACHE_TTL,
+                                      hierarchy_sensitive=True)
+
 
 class InterestBaseApprovalTMixin(TendrilTBaseModel):
     has_required_approvals: bool
@@ -82,7 +103,7 @@ class InterestApprovalsMixin(InterestMixinBase):
     def approvals(self, auth_user=None, session=None):
         if not hasattr(self, '_approvals') or not self._approvals:
             self._approvals = ApprovalCollector()
-            self._approvals.add_approvals(get_approval(subject=self, session=session))
+            self._approvals.add_records(get_approval_records(subject=self, session=session))
             self._approvals.process()
         return self._approvals
 
@@ -91,22 +112,38 @@ class InterestApprovalsMixin(InterestMixinBase):
         #  Consider use of redis caching or a back channel cache management
         #  messaging system
         self._approvals = None
+        _approvals_pending_memo.pop(self.id)
 
     @with_db
-    def signal_approval_granted(self, approval, session=None):
-        # print(f"SIGNAL : APPROVAL_GRANTED : {approval}")
+    def reevaluate_activation(self, session=None):
         self._clear_approval_cache()
         if self.status == LifecycleStatus.APPROVAL:
             if self.check_activation_approvals(auth_user=None, session=session):
                 self.activate(session=session)
+        elif self.status == LifecycleStatus.ACTIVE:
+            if not self.check_activation_approvals(auth_user=None, session=session):
+                self.unapprove(session=session)
+
+    @with_db
+    def _signal_activation_change(self, session=None):
+        if INTERESTS_APPROVALS_DEFERRED_ACTIVATION and \
+                activation_evaluator.enqueue(self.id):
+            return
+        self.reevaluate_activation(session=session)
+
+    @with_db
+    def signal_approval_granted(self, approval, session=None):
+        # print(f"SIGNAL : APPROVAL_GRANTED : {approval}")
+        self._clear_approval_cache()
+        if self.status == LifecycleStatus.APPROVAL:
+            self._signal_activation_change(session=session)
 
     @with_db
     def signal_approval_withdrawn(self, approval, session=None):
         # print(f"SIGNAL : APPROVAL_WITHDRAWN : {approval}")
         self._clear_approval_cache()
         if self.status == LifecycleStatus.ACTIVE:
-            if not self.check_activation_approvals(auth_user=None, session=session):
-                self.unapprove(session=session)
+            self._signal_activation_change(session=session)
 
     @with_db
     def signal_approval_rejected(self, approval, session=None):
@@ -114,35 +151,41 @@ class InterestApprovalsMixin(InterestMixinBase):
         self._clear_approval_cache()
 
     @with_db
-    def _check_approval(self, required_approval: ApprovalRequirement, session=None):
+    def _approval_possible_contexts(self, session=None):
+        # Possible approval contexts by context type, from this interest and
+        # a single query for its ancestors.
+        rv = {self.model_instance.type_name: [self.id]}
+        for ancestor_id, ancestor_type, _, _ in get_ancestor_links(self.id, session=session):
+            if ancestor_id not in rv.setdefault(ancestor_type, []):
+                rv[ancestor_type].append(ancestor_id)
+        return rv
+
+    @with_db
+    def _check_approval(self, required_approval: ApprovalRequirement,
+                        possible_contexts=None, collector=None, session=None):
         logger.debug(f"Checking {self.type_name} {self.id} for {required_approval.name}")
-        possible_contexts = []
-        if required_approval.context_type == self.model_instance.type_name:
-            possible_contexts.append(self.id)
-        for ancestor in self.ancestors(session=session):
-            # logger.debug(f"Trying Ancestor  : {ancestor.type_name} {ancestor.id}")
-            if ancestor.model_instance.type_name == required_approval.context_type:
-                # logger.debug(f"Found Possible Context {ancestor.type_name} {ancestor.id}")
-                possible_contexts.append(ancestor.id)
-
-        if len(possible_contexts) == 0:
+        if possible_contexts is None:
+            possible_contexts = self._approval_possible_contexts(session=session)
+        contexts = possible_contexts.get(required_approval.context_type, [])
+
+        if len(contexts) == 0:
             logger.debug(f"Found no possible contexts of type "
                          f"{required_approval.context_type} "
-                         f"the hierarchy for {self.id}.")
-            logger.debug(f"Got Ancestors : {self.ancestors(session=session)}")
+                         f"the hierarchy for {self.id}. Got context types : "
+                         f"{list(possible_contexts.keys())}")
             return True
 
         approvals = []
-        for context in possible_contexts:
-            rejections = self.approvals(session=session).\
-                approvals(subject=self.id, context=context,
-                          name=required_approval.name, approved=False)
+        if collector is None:
+            collector = self.approvals(session=session)
+        for context in contexts:
+            rejections = collector.approvals(subject=self.id, context=context,
+                                             name=required_approval.name, approved=False)
             if len(rejections):
                 logger.debug("Rejections present. Not checking further. Not activating.")
                 return False
-            approvals += self.approvals(session=session).\
-                approvals(subject=self.id, context=context,
-                          name=required_approval.name)
+            approvals += collector.approvals(subject=self.id, context=context,
+                                             name=required_approval.name)
 
         if required_approval.spread == 0:
             # logger.debug(f"Required spread is 0. Not checking for approvals.")
@@ -165,12 +208,27 @@ class InterestApprovalsMixin(InterestMixinBase):
     @with_db
     @require_permission('read_approvals', strip_auth=False, required=False)
     def approvals_pending(self, auth_user=None, session=None) -> Iterator[ApprovalRequirement]:
-        # logger.debug(f"Checking for pending approvals for interest {self.id}")
-        for required_approval in self.approvals_required(auth_user=auth_user, session=session):
-            # logger.debug(f"Checking for {required_approval}")
-            if not self._check_approval(required_approval, session=session):
-                # logger.debug(f"Found a pending approval {required_approval.name}")
-                yield required_approval
+        pending = self._evaluate_approvals_pending(session=session)
+        _approvals_pending_memo.set(self.id, pending)
+        yield from pending
+
+    @with_db
+    def _approvals_pending_cached(self, session=None):
+        pending = _approvals_pending_memo.get(self.id)
+        if pending is None:
+            pending = self._evaluate_approvals_pending(session=session)
+            _approvals_pending_memo.set(self.id, pending)
+        return pending
+
+    @with_db
+    def _evaluate_approvals_pending(self, session=None):
+        # All the requirements are evaluated against a single collector and
+        # a single set of possible contexts.
+        possible_contexts = self._approval_possible_contexts(session=session)
+        collector = self.approvals(session=session)
+        return [x for x in self.approvals_required(session=session)
+                if not self._check_approval(x, possible_contexts=possible_contexts,
+                                            collector=collector, session=session)]
 
     @with_db
     @require_state([LifecycleStatus.ACTIVE, LifecycleStatus.APPROVAL])
@@ -243,7 +301,7 @@ class InterestApprovalsMixin(InterestMixinBase):
 
         try:
             self._check_activation_requirements(session=session)
-            if next(self.approvals_pending(auth_user=auth_user, session=session), None):
+            if self._approvals_pending_cached(session=session):
                 rv['has_required_approvals'] = False
             else:
                 rv['has_required_approvals'] = True
@@ -326,7 +384,7 @@ class InterestApprovalsContextMixin(InterestMixinBase):
     @require_state(LifecycleStatus.ACTIVE)
     def _get_approvals(self, subject_id, auth_user=None, session=None):
         ac = ApprovalCollector()
-        ac.add_approvals(get_approval(context=self.id, subject=subject_id, session=session))
+        ac.add_records(get_approval_records(context=self.id, subject=subject_id, session=session))
         ac.process()
         return ac
 
@@ -347,6 +405,61 @@ class InterestApprovalsContextMixin(InterestMixinBase):
         # return self._approvals[subject.id]
         return self._get_approvals(subject.id, auth_user=auth_user, session=session)
 
+    def _inbox_requirements(self):
+        # Required approvals of each subject type which are given in contexts
+        # of this type.
+        from tendril.interests import type_codes
+        rv = {}
+        for type_name, interest_class in type_codes.items():
+            if not issubclass(interest_class, InterestApprovalsMixin):
+                continue
+            requirements = [x for x in interest_class.model.approval_spec.required_approvals
+                            if x.context_type == self.model_instance.type_name and x.spread > 0]
+            if requirements:
+                rv[type_name] = requirements
+        return rv
+
+    @with_db
+    @require_state(LifecycleStatus.ACTIVE)
+    @require_permission('read_approvals', strip_auth=False)
+    def approvals_inbox(self, offset=0, limit=None, auth_user=None, session=None):
+        # Approvals outstanding in this context for all descendants awaiting
+        # approval. Subjects with a rejection in this context are not listed.
+        requirements = self._inbox_requirements()
+        subjects = []
+        if requirements:
+            subjects = get_descendants(self.id, types=list(requirements.keys()),
+                                       state=LifecycleStatus.APPROVAL, session=session)
+        counts, rejected = {}, set()
+        if subjects:
+            records = get_approval_records(context=self.id, subjects=[x.id for x in subjects],
+                                           session=session)
+            for subject_id, _, approval, approved, _, _ in records:
+                if approved:
+                    counts[(subject_id, approval)] = counts.get((subject_id, approval), 0) + 1
+                else:
+                    rejected.add((subject_id, approval))
+
+        items = []
+        for subject in subjects:
+            for requirement in requirements[subject.type]:
+                key = (subject.id, requirement.name)
+                approvals = counts.get(key, 0)
+                if key in rejected or approvals >= requirement.spread:
+                    continue
+                items.append({'subject': subject.id,
+                              'subject_type': subject.type,
+                              'subject_name': subject.name,
+                              'approval': requirement.name,
+                              'spread': requirement.spread,
+                              'approvals': approvals,
+                              'remaining': requirement.spread - approvals})
+        return {'context': self.id,
+                'total': len(items),
+                'offset': offset,
+                'limit': limit,
+                'items': items[offset:offset + limit] if limit else items[offset:]}
+
     @with_db
     def check_approval(self, subject, required_approval, auth_user=None, session=None):
         subject = self._get_approval_subject(subject, session=session)
@@ -408,6 +521,86 @@ class InterestApprovalsContextMixin(InterestMixinBase):
         subject.signal_approval_rejected(result, session=session)
         return result
 
+    @with_db
+    def _bulk_discriminate(self, subjects, approval_type=None, auth_user=None, session=None):
+        # The approval type is discriminated once per subject type and shared
+        # across all subjects of that type. Returns {subject id: approval type
+        # or exception}. Permission and state failures depend on the subject
+        # itself, so they are recorded for that subject only, and the next
+        # subject of the type is tried afresh.
+        by_type, rv = {}, {}
+        for subject in subjects:
+            if subject.type_name not in by_type:
+                try:
+                    by_type[subject.type_name] = self.approval_type_discriminator(
+                        subject=subject, approval_type=approval_type,
+                        auth_user=auth_user, session=session
+                    )
+                except (ApprovalTypeUnrecognized, ApprovalTypeAmbiguity) as e:
+                    by_type[subject.type_name] = e
+                except (AuthorizationRequiredError, InterestStateException) as e:
+                    rv[subject.id] = e
+                    continue
+            rv[subject.id] = by_type[subject.type_name]
+        return rv
+
+    @with_db
+    @require_state(LifecycleStatus.ACTIVE)
+    @require_permission('grant_approvals', strip_auth=False)
+    def approvals_bulk(self, subjects, approval_type=None, reject=False,
+                       auth_user=None, session=None):
+        # Grant or reject approvals for many subjects in a single session.
+        # Failures are reported per subject and do not affect the others.
+        from tendril.interests import type_codes
+        subjects = list(dict.fromkeys(subjects))
+        found = {x.id: type_codes[x.type_name](x)
+                 for x in get_interests(ids=subjects, session=session)}
+
+        results, accepted = {}, []
+        for subject_id in subjects:
+            subject = found.get(subject_id)
+            if subject is None:
+                results[subject_id] = (None, 'error', 'Interest not found')
+                continue
+            try:
+                subject.check_accepts_approval(session=session)
+            except InterestStateException as e:
+                results[subject_id] = (None, 'error', str(e))
+                continue
+            accepted.append(subject)
+
+        discriminated = self._bulk_discriminate(accepted, approval_type=approval_type,
+                                                auth_user=auth_user, session=session)
+        to_register = []
+        for subject in accepted:
+            atype = discriminated[subject.id]
+            if isinstance(atype, Exception):
+                results[subject.id] = (None, 'error', f"Could not determine the approval "
+                                                      f"type : {atype.__class__.__name__}")
+                continue
+            to_register.append((atype, subject))
+
+        created, skipped = register_approvals(
+            [(atype.name, self.id, subject.id) for atype, subject in to_register],
+            user=auth_user, reject=reject, session=session
+        )
+        skipped = {x[2] for x in skipped}
+        created = {x.interest_id: x for x in created}
+        for atype, subject in to_register:
+            if subject.id in skipped:
+                results[subject.id] = (atype.name, 'skipped',
+                                       "User has already provided an approval or rejection")
+                continue
+            if reject:
+                subject.signal_approval_rejected(created[subject.id], session=session)
+            else:
+                subject.signal_approval_granted(created[subject.id], session=session)
+            results[subject.id] = (atype.name, 'rejected' if reject else 'granted', None)
+
+        return [{'subject': x, 'approval': results[x][0],
+                 'result': results[x][1], 'detail': results[x][2]}
+                for x in dict.fromkeys(subjects)]
+
     @with_db
     def approvals_validate(self, auth_user=None, session=None):
         raise NotImplementedError
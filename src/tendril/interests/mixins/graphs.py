@@ -1,14 +1,12 @@
 
 
-from tendril.core.topology.grafana.teams import ensure_graphs_team
-from tendril.core.topology.grafana.folders import ensure_graphs_folder
-from tendril.connectors.grafana.actions.dashboards import get_dashboard
-from tendril.connectors.grafana.actions.dashboards import upsert_dashboard
-from tendril.connectors.grafana.models.dashboard import generate_dashboard
+import asyncio
+
+from tendril.common.interests.graphs import graphs_provisioner
 
 from .base import InterestMixinBase
 from tendril.config import GRAFANA_TEAM_COMPOSITION
-from tendril.config import GRAFANA_BASE_URL
+from tendril.config import INTERESTS_GRAPHS_PROVISION_BACKGROUND
 
 from tendril.utils import log
 logger = log.get_logger(__name__)
@@ -26,48 +24,40 @@ class InterestGraphsMixin(InterestMixinBase):
                 if candidate.type_name == candidate_type_name:
                     return candidate
 
-    async def _graphs_get(self, team_id, folder_uid):
-        response = {}
-        for spec_class in self.graphs_specs:
-            spec = spec_class(actual=self)
-            dashboard_uid = spec.uid
+    async def _graphs_get_one(self, spec, team_id, folder_uid):
+        dashboard_uid = spec.uid
+        url = await graphs_provisioner.lookup(dashboard_uid)
 
-            logger.debug(f"Searching for dashboard {dashboard_uid}")
-            dashboard_info = await get_dashboard(dashboard_uid)
+        if not url:
+            if INTERESTS_GRAPHS_PROVISION_BACKGROUND:
+                logger.info(f"Scheduling provisioning of dashboard {dashboard_uid}")
+                graphs_provisioner.schedule(dashboard_uid, self.id, spec.name,
+                                            team_id, folder_uid)
+                return None
+            url = await graphs_provisioner.provision(spec, team_id, folder_uid)
 
-            if not dashboard_info:
-                logger.info(f"Generating dashboard {dashboard_uid}")
-                payload = await generate_dashboard(spec)
-                payload.setdefault('uid', dashboard_uid)
-                logger.debug(f"Publishing dashboard {dashboard_uid}")
-                dashboard_info = await upsert_dashboard(
-                    payload, team_id=team_id, folder_uid=folder_uid,
-                    commit_msg="Generated from spec"
-                )
-                url = GRAFANA_BASE_URL + dashboard_info['url']
-            else:
-                url = f"{GRAFANA_BASE_URL}{dashboard_info['meta']['url']}"
+        if not url:
+            return None
 
-            if not url:
-                return {}
+        logger.debug(f"Constructing url params for '{dashboard_uid}'")
+        params = {}
+        for name, value in spec.variables_url.items():
+            params[f'var-{name}']= value
+        return {'url': url, 'params': params}
 
-            logger.debug(f"Constructing url params for '{dashboard_uid}'")
-            params = {}
-            for name, value in spec.variables_url.items():
-                params[f'var-{name}']= value
-            response[spec.name] = {'url': url, 'params': params}
-        return response
+    async def _graphs_get(self, team_id, folder_uid):
+        specs = [spec_class(actual=self) for spec_class in self.graphs_specs]
+        results = await asyncio.gather(
+            *[self._graphs_get_one(spec, team_id, folder_uid) for spec in specs]
+        )
+        return {spec.name: result for spec, result in zip(specs, results) if result}
 
     async def graphs(self):
         if not self.graphs_specs:
             return {}
         logger.debug("Determining Graphs Owner")
         owner = self._graphs_owner()
-        logger.debug("Determining grafana team_id")
-        graphs_team_id = await ensure_graphs_team(interest_type=owner.type_name, interest_name=owner.name)
-        logger.debug("Determining grafana folder_id")
-        folder_uid = await ensure_graphs_folder(interest_type=owner.type_name, interest_name=owner.name,
-                                                descriptive_name=owner.descriptive_name)
+        team_id, folder_uid = await graphs_provisioner.target(owner)
         logger.debug("Determining embeddable graphs")
-        response = await self._graphs_get(graphs_team_id, folder_uid)
+        response = await self._graphs_get(team_id, folder_uid)
         return response
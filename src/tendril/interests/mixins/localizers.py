@@ -10,10 +10,24 @@ from tendril.utils.pydantic import TendrilTBaseModel
 from .base import InterestMixinBase
 from tendril.utils.db import with_db
 from tendril.common.interests.representations import ExportLevel
+from tendril.common.interests.caching import SharedHierarchyCache
+
+from tendril.config import INTERESTS_LOCALIZERS_CACHE_SIZE
+from tendril.config import INTERESTS_LOCALIZERS_CACHE_TTL
+from tendril.config import INTERESTS_LOCALIZERS_CACHE_TRANSIT
+
 from tendril.utils import log
 logger = log.get_logger(__name__)
 
 
+_localizers_cache = SharedHierarchyCache(
+    namespace='ilz',
+    maxsize=INTERESTS_LOCALIZERS_CACHE_SIZE,
+    ttl=INTERESTS_LOCALIZERS_CACHE_TTL,
+    use_transit=INTERESTS_LOCALIZERS_CACHE_TRANSIT,
+)
+
+
 # TODO Use the interest stub model here.
 #  We've probably already defined it somewhere.
 InterestReferenceTModel = Any
@@ -48,10 +62,18 @@ class InterestLocalizersMixin(InterestMixinBase):
                 rv[f'{candidate.type_name}-{idx}'] = stub
         return rv
 
-    def cached_localizers(self, session=None):
-        if not hasattr(self, '_localizers'):
-            self._localizers = self.localizers(session=session)
-        return self._localizers
+    def cached_localizers(self, export_level=ExportLevel.NORMAL, session=None):
+        # Localizers are cached across interest instances (and optionally
+        # across processes) by interest id. Only two representations are
+        # actually produced by localizers(), so the cache is keyed on those.
+        if export_level >= ExportLevel.NORMAL:
+            export_level = ExportLevel.NORMAL
+        else:
+            export_level = ExportLevel.ID_ONLY
+        return _localizers_cache.get(
+            f'{self.id}:{export_level.value}',
+            lambda: self.localizers(export_level=export_level, session=session)
+        )
 
     @with_db
     def compacted_localizers(self, session=None):
@@ -63,5 +85,5 @@ class InterestLocalizersMixin(InterestMixinBase):
             rv.update(super().export(export_level=export_level, session=session,
                                      auth_user=auth_user, **kwargs))
         if export_level > ExportLevel.ID_ONLY:
-            rv['localizers'] = self.localizers(export_level=ExportLevel.ID_ONLY, session=session)
+            rv['localizers'] = self.cached_localizers(export_level=ExportLevel.ID_ONLY, session=session)
         return rv
@@ -3,23 +3,27 @@
 import time
 import re
 import json
+import asyncio
 import pytz
 from datetime import datetime
+from datetime import timedelta
+from functools import lru_cache
 from pydantic import Field
 
 from os.path import commonprefix
 from fnmatch import fnmatch
 from typing import List
+from typing import Dict
 from typing import Any
 from typing import Optional
 from typing import Union
 
 from tendril.caching import transit
+from tendril.core.mq.aio import with_mq_client
 from tendril.core.tsdb.query.models import QueryTimeSpanTModel
 from tendril.core.tsdb.query.models import TimeSeriesQueryItemTModel
 from tendril.core.tsdb.query.planner import TimeSeriesQueryPlanner
 from tendril.core.tsdb.constants import TimeSeriesExporter
-from tendril.core.mq.aio import with_mq_client
 from tendril.core.tsdb.aio import tsdb_execute_query_plan
 
 # TODO Replace with a query planner
@@ -28,23 +32,79 @@ from tendril.connectors.influxdb.aio import influxdb_execute_query
 
 from tendril.monitors.spec import MonitorSpec
 from tendril.monitors.spec import MonitorPublishFrequency
-from tendril.monitors.spec import DecimalEncoder
+from tendril.monitors.spec import periodic_publish_frequencies
+from tendril.monitors.spec import encode_publish_point
+from tendril.monitors.publisher import publish_point
+from tendril.monitors.query import GroupedMonitorsFluxQueryBuilder
+from tendril.monitors.publisher import monitor_publish_batcher
+from tendril.monitors.ingest import monitor_ingest_pipeline
+from tendril.monitors.timestamps import normalize_timestamp
 
 from tendril.utils.pydantic import TendrilTBaseModel
 from tendril.utils.types.unitbase import UnitBase
 from tendril.common.interests.representations import ExportLevel
+from tendril.common.interests.exceptions import AuthorizationRequiredError
+from tendril.common.interests.caching import BoundedMemo
+from tendril.common.interests.caching import SingleFlight
+from tendril.common.interests.caching import transit_write_many
 from tendril.authz.roles.interests import require_permission
 
 from tendril.config import INFLUXDB_MONITORS_BUCKET
 from tendril.config import INFLUXDB_MONITORS_TOKEN
+from tendril.config import INTERESTS_MONITORS_PUBLISH_BATCHED
+from tendril.config import INTERESTS_MONITORS_PUBLISH_LOC_CACHE_SIZE
+from tendril.config import INTERESTS_MONITORS_PUBLISH_LOC_CACHE_TTL
+from tendril.config import INTERESTS_MONITORS_DISCOVERY_CONCURRENCY
+from tendril.config import INTERESTS_MONITORS_DISCOVERY_CACHE_SIZE
+from tendril.config import INTERESTS_MONITORS_DISCOVERY_CACHE_TTL
+from tendril.config import INTERESTS_MONITORS_HISTORICAL_CACHE_SIZE
+from tendril.config import INTERESTS_MONITORS_HISTORICAL_HEAD_TTL
+from tendril.config import INTERESTS_MONITORS_HISTORICAL_CLOSED_TTL
+from tendril.config import INTERESTS_MONITORS_INGEST_ENABLED
 
 from .base import InterestMixinBase
 from tendril.utils import log
 logger = log.get_logger(__name__)
 
 
-local_tz = pytz.timezone("Asia/Kolkata")
 idx_rex = re.compile(r"^(?P<key>\S+)\[(?P<idx>\d+)\]")
+_publish_loc_memo = BoundedMemo(maxsize=INTERESTS_MONITORS_PUBLISH_LOC_CACHE_SIZE,
+                                ttl=INTERESTS_MONITORS_PUBLISH_LOC_CACHE_TTL,
+                                hierarchy_sensitive=True)
+_discovered_keys_memo = BoundedMemo(maxsize=INTERESTS_MONITORS_DISCOVERY_CACHE_SIZE,
+                                    ttl=INTERESTS_MONITORS_DISCOVERY_CACHE_TTL)
+_historical_memo = BoundedMemo(maxsize=INTERESTS_MONITORS_HISTORICAL_CACHE_SIZE,
+                               hierarchy_sensitive=True)
+_historical_inflight = SingleFlight()
+
+
+def _monitor_compile_step(part):
+    match = idx_rex.match(part)
+    if match:
+        return match.group('key'), int(match.group('idx'))
+    return part, None
+
+
+@lru_cache(maxsize=1024)
+def _monitor_compile_path(path):
+    # Report paths are compiled once into the steps before and after the
+    # '*' discriminator, and shared by all interests using the same spec.
+    head, tail = [], None
+    for part in path.split('.'):
+        if tail is not None:
+            tail.append(_monitor_compile_step(part))
+        elif part == '*':
+            tail = []
+        else:
+            head.append(_monitor_compile_step(part))
+    return tuple(head), (tuple(tail) if tail is not None else None)
+
+
+@with_mq_client()
+async def _monitors_publish_unbatched(publishes, timestamp, mq=None):
+    await asyncio.gather(*[interest.monitor_publish(spec, value, name=name,
+                                                    timestamp=timestamp, mq=mq)
+                           for interest, spec, name, value in publishes])
 
 
 class MonitorQueryItemTModel(TendrilTBaseModel):
@@ -55,6 +115,17 @@ class MonitorQueryItemTModel(TendrilTBaseModel):
 class MonitorsQueryTModel(TendrilTBaseModel):
     time_span: QueryTimeSpanTModel = Field(default_factory=QueryTimeSpanTModel)
     monitors: Optional[List[Union[str, MonitorQueryItemTModel]]]
+    max_points: Optional[int] = Field(None, gt=0)
+
+
+class MonitorsMultiQueryTModel(TendrilTBaseModel):
+    interests: List[int]
+    query: MonitorsQueryTModel = Field(default_factory=MonitorsQueryTModel)
+
+
+class MonitorsBulkReportTModel(TendrilTBaseModel):
+    reports: Dict[int, Dict[str, Any]]
+    timestamp: Optional[Union[int, datetime]]
 
 
 class InterestBaseMonitorsTMixin(TendrilTBaseModel):
@@ -82,6 +153,19 @@ class InterestMonitorsMixin(InterestMixinBase):
         }
 
     def _monitor_get_publish_loc(self, spec, name=None, for_read=False):
+        # The publish location depends only on the interest, its hierarchy and
+        # the monitor name. It is memoized across interest instances, and the
+        # memo is cleared when the hierarchy changes. Callers get their own copy
+        # of the tags, since they are expected to modify them.
+        memo_key = (self.id, spec.publish_name(), name, for_read)
+        loc = _publish_loc_memo.get(memo_key)
+        if loc is None:
+            loc = self._monitor_build_publish_loc(spec, name=name, for_read=for_read)
+            _publish_loc_memo.set(memo_key, loc)
+        measurement, tags = loc
+        return measurement, dict(tags)
+
+    def _monitor_build_publish_loc(self, spec, name=None, for_read=False):
         tags = {}
         if not for_read and spec.localization_from_hierarchy:
             if hasattr(self, 'cached_localizers'):
@@ -107,31 +191,11 @@ class InterestMonitorsMixin(InterestMixinBase):
 
         return measurement, tags
 
-    @with_mq_client()
     async def monitor_publish(self, spec: MonitorSpec, value,
                               name=None, timestamp=None,
                               additional_localizers=None,
-                              mq=None):
-        if not timestamp:
-            timestamp = time.clock_gettime_ns(time.CLOCK_REALTIME)
-        elif isinstance(timestamp, datetime):
-            # If a timestamp is provided, it should be timezone-aware. If it isn't, we
-            # assume it is in UTC.
-            if timestamp.tzinfo is None or timestamp.tzinfo.utcoffset(timestamp) is None:
-                timestamp = timestamp.replace(tzinfo=pytz.utc)
-            # We actually store in local time. This is something that should be corrected.
-            # It is as it is now for legacy reasons. Specifically, to be consistent with
-            # the naive use of time.clock_gettime_ns above, and all the downstream users of
-            # monitor data across instances
-            timestamp = timestamp.astimezone(local_tz)
-            timestamp = int(timestamp.timestamp() * (10 ** 9))
-        elif isinstance(timestamp, int):
-            # Something further up the chain probably used time.clock_gettime_ns. This is
-            # treated as a ns precision timestamp in localtime.
-            pass
-        else:
-            logger.warn(f"Got timestamp '{timestamp}' of type {type(timestamp)} for monitor "
-                        f"'{spec.publish_name()}'. This is likely incorrect.")
+                              batched=None, mq=None):
+        timestamp = normalize_timestamp(timestamp, context=spec.publish_name())
         if not name:
             name = spec.publish_name()
         bucket = 'im'
@@ -141,8 +205,9 @@ class InterestMonitorsMixin(InterestMixinBase):
         if additional_localizers:
             tags.update(additional_localizers)
 
-        # We don't use the usual serializers here. Instead, we rely on the DecimalEncoder
-        # This is another significant source of fragility and may need to be improved.
+        # We don't use the usual serializers here. Instead, we rely on the envelope
+        # encoder, which follows the DecimalEncoder. This is another significant
+        # source of fragility and may need to be improved.
         # value = spec.get_serializer()(value)
         if isinstance(spec.structure, str):
             fields = {spec.structure: value}
@@ -154,49 +219,146 @@ class InterestMonitorsMixin(InterestMixinBase):
                 if key in tags.keys():
                     fields[key] = tags.pop(key)
 
-        msg = json.dumps({'measurement': measurement,
-                       'tags': tags,
-                     'fields': fields,
-                  'timestamp': timestamp}, cls=DecimalEncoder)
+        point = {'measurement': measurement,
+                        'tags': tags,
+                      'fields': fields,
+                   'timestamp': timestamp}
 
         key = f'{bucket}.{self.type_name}.{measurement}'
-        await mq.publish(key, msg)
+        if mq:
+            await mq.publish(key, encode_publish_point(point))
+        else:
+            await publish_point(key, point, batched=batched)
+
+    def _monitor_get_publish_state_loc(self, spec, name=None):
+        # Last published value and time. This is kept in a separate namespace
+        # so it does not show up in the dynamic key searches on the hot values.
+        return {
+            'namespace': f'imp:{self.id}',
+            'key': name or spec.publish_name()
+        }
+
+    def _monitor_get_publish_state(self, spec, name=None):
+        state = transit.read(deser=json.loads,
+                             **self._monitor_get_publish_state_loc(spec, name))
+        if not state:
+            return None, None
+        value, published_at = state
+        if value is not None:
+            value = spec.get_deserializer()(value)
+        return value, published_at
+
+    def _monitor_publish_state_write(self, spec, value, name=None):
+        if value is not None:
+            value = spec.get_serializer()(value)
+        ttl = 2 * spec.publish_period if spec.publish_period else None
+        return dict(value=[value, time.time()], ser=json.dumps, ttl=ttl,
+                    **self._monitor_get_publish_state_loc(spec, name))
+
+    def _monitor_set_publish_state(self, spec, value, name=None):
+        transit.write(**self._monitor_publish_state_write(spec, value, name=name))
+
+    @staticmethod
+    def _monitor_exceeds_threshold(spec, value, last_value):
+        if last_value is None:
+            return True
+        if spec.publish_threshold is None:
+            return value != last_value
+        try:
+            return abs(value - last_value) >= spec.publish_threshold
+        except TypeError:
+            return value != last_value
+
+    @staticmethod
+    def _monitor_period_elapsed(spec, published_at):
+        if not published_at or not spec.publish_period:
+            return True
+        return time.time() - published_at >= spec.publish_period
+
+    def _monitor_should_publish(self, spec, value, old_value, name=None):
+        frequency = spec.publish_frequency
+        match frequency:
+            case MonitorPublishFrequency.NEVER:
+                return False
+            case MonitorPublishFrequency.ALWAYS:
+                return True
+            case MonitorPublishFrequency.ONCHANGE:
+                return old_value != value
+
+        last_value, published_at = self._monitor_get_publish_state(spec, name)
+        if frequency in periodic_publish_frequencies:
+            if self._monitor_period_elapsed(spec, published_at):
+                return True
+        match frequency:
+            case MonitorPublishFrequency.ONCHANGE_OR_PERIODIC:
+                return old_value != value
+            case MonitorPublishFrequency.ONCHANGE_THESHOLD | \
+                    MonitorPublishFrequency.ONCHANGE_THESHOLD_OR_PERIODIC:
+                return self._monitor_exceeds_threshold(spec, value, last_value)
+        return False
+
+    def _monitor_hot_write(self, spec, value, name=None):
+        kwargs = self._monitor_get_cache_loc(spec)
+        if name:
+            kwargs['key'] = name
+        kwargs.update({'value': value, 'ttl': spec.expire,
+                       'ser': spec.get_serializer(), 'get': True})
+        return kwargs
+
+    @staticmethod
+    def _monitor_hot_old_value(spec, old_value):
+        if old_value:
+            deser = spec.get_deserializer()
+            if isinstance(old_value, bytes):
+                old_value = old_value.decode()
+            if deser:
+                old_value = deser(old_value)
+        return old_value
 
     async def monitor_write(self, spec: MonitorSpec, value,
                             name=None, timestamp=None,
-                            additional_localizers=None):
+                            additional_localizers=None, batched=None):
+        old_value = None
         if spec.keep_hot:
             # Publish to cache
-            kwargs = self._monitor_get_cache_loc(spec)
-            if name:
-                kwargs['key'] = name
-            kwargs.update({'ttl': spec.expire, 'ser': spec.get_serializer(), 'get': True})
-
             # TODO Replace with async when tendril-caching allows it
-            old_value = transit.write(value, **kwargs)
-            if old_value:
-                deser = spec.get_deserializer()
-                if isinstance(old_value, bytes):
-                    old_value = old_value.decode()
-                if deser:
-                    old_value = deser(old_value)
-        publish = False
-        match spec.publish_frequency:
-            case MonitorPublishFrequency.ALWAYS:
-                publish = True
-            case MonitorPublishFrequency.ONCHANGE:
-                if old_value != value:
-                    publish = True
-        if publish:
+            old_value = transit.write(**self._monitor_hot_write(spec, value, name=name))
+            old_value = self._monitor_hot_old_value(spec, old_value)
+        if self._monitor_should_publish(spec, value, old_value, name=name):
             await self.monitor_publish(spec, value, name=name, timestamp=timestamp,
-                                       additional_localizers=additional_localizers)
+                                       additional_localizers=additional_localizers,
+                                       batched=batched)
+            if spec.tracks_publish_state:
+                self._monitor_set_publish_state(spec, value, name=name)
+
+    async def monitors_heartbeat(self):
+        # Republish the current value of periodic monitors which have not been
+        # published within their publish period. This is run by the heartbeat
+        # scheduler, so that idle monitors continue to show up in the TSDB.
+        for spec in self.monitors_spec:
+            if spec.publish_frequency not in periodic_publish_frequencies:
+                continue
+            if spec.multiple_container:
+                prefix, keys = self._monitor_get_dynamic_keys(spec)
+                names = [prefix + key for key in keys]
+            else:
+                names = [spec.publish_name()]
+            for name in names:
+                _, published_at = self._monitor_get_publish_state(spec, name)
+                if not self._monitor_period_elapsed(spec, published_at):
+                    continue
+                value = transit.read(namespace=f'im:{self.id}', key=name,
+                                     deser=spec.get_deserializer())
+                if value is None:
+                    continue
+                await self.monitor_publish(spec, value, name=name)
+                self._monitor_set_publish_state(spec, value, name=name)
 
     async def monitor_report_async(self, monitor, value, timestamp=None):
         spec = self.monitor_get_spec(monitor)
         if not spec:
             return
-        if not timestamp:
-            timestamp = time.clock_gettime_ns(time.CLOCK_REALTIME)
+        timestamp = normalize_timestamp(timestamp)
         await self.monitor_write(spec, value, name=monitor,
                                  timestamp=timestamp)
 
@@ -205,59 +367,41 @@ class InterestMonitorsMixin(InterestMixinBase):
         spec = self.monitor_get_spec(monitor)
         if not spec:
             return
+        if INTERESTS_MONITORS_INGEST_ENABLED:
+            # Timestamps are normalized by the pipeline, a batch at a time.
+            monitor_ingest_pipeline.submit(self, spec, value, name=monitor,
+                                           timestamp=timestamp)
+            return
+        timestamp = normalize_timestamp(timestamp)
         if not background_tasks:
             raise NotImplementedError("Monitors currently need to be updated through "
-                                      "apiserver endpoints with background_tasks.")
-        if not timestamp:
-            timestamp = time.clock_gettime_ns(time.CLOCK_REALTIME)
+                                      "apiserver endpoints with background_tasks, "
+                                      "or with the ingest pipeline enabled.")
         background_tasks.add_task(self.monitor_write, spec, value,
                                   name=monitor, timestamp=timestamp)
 
-    def _monitor_extract(self, parts, walker):
-        for part in parts:
-            match = idx_rex.match(part)
+    def _monitor_extract(self, steps, walker):
+        for key, idx in steps:
             try:
-                if match:
-                    walker = walker[match.group('key')]
-                    walker = walker[int(match.group('idx'))]
-                else:
-                    walker = walker[part]
-            except KeyError:
+                walker = walker[key]
+                if idx is not None:
+                    walker = walker[idx]
+            except (KeyError, IndexError, TypeError):
                 return None
         return walker
 
-    def _monitor_extract_discriminated(self, parts, walker, discriminators):
+    def _monitor_extract_discriminated(self, steps, walker, discriminators):
         rv = {}
         for discriminator in discriminators:
-            rv[discriminator] = self._monitor_extract(parts, walker[discriminator])
+            rv[discriminator] = self._monitor_extract(steps, walker[discriminator])
         return rv
 
     def _monitor_extract_from_report(self, path, report):
-        parts = path.split('.')
-        walker = report
-        discriminators = None
-        for part in parts:
-            if discriminators:
-                subparts.append(parts)
-                continue
-            elif part == '*':
-                subparts = []
-                discriminators = walker.keys()
-                continue
-            else:
-                match = idx_rex.match(part)
-                try:
-                    if match:
-                        walker = walker[match.group('key')]
-                        walker = walker[int(match.group('idx'))]
-                    else:
-                        walker = walker[part]
-                except KeyError:
-                    return None
-        if not discriminators:
+        head, tail = _monitor_compile_path(path)
+        walker = self._monitor_extract(head, report)
+        if walker is None or tail is None:
             return walker
-        else:
-            return self._monitor_extract_discriminated(subparts, walker, discriminators)
+        return self._monitor_extract_discriminated(tail, walker, walker.keys())
 
     def _monitor_process_value(self, monitor_spec, value):
         if value is not None:
@@ -271,31 +415,101 @@ class InterestMonitorsMixin(InterestMixinBase):
                 value = monitor_spec.deserializer(value)
         return value
 
-    def _monitor_process_discriminated_value(self, monitor_spec, values,
-                                             timestamp=None, background_tasks=None):
-        if isinstance(values, dict):
-            for discriminator, discriminated_value in values.items():
-                value = self._monitor_process_value(monitor_spec, discriminated_value)
-                name = monitor_spec.publish_name().replace('*', discriminator)
-                self.monitor_report(name, value, timestamp=timestamp,
-                                    background_tasks=background_tasks)
-
-    def monitors_report(self, report, timestamp=None, background_tasks=None):
-        # pprint(report)
-        if not timestamp:
-            timestamp = time.clock_gettime_ns(time.CLOCK_REALTIME)
+    def _monitors_report_values(self, report):
+        # Yields (spec, name, value) for each monitor value found in the report.
         for monitor_spec in self.monitors_spec:
             value = self._monitor_extract_from_report(monitor_spec.path, report)
             if value is None:
                 continue
             if monitor_spec.multiple_container and isinstance(value, monitor_spec.multiple_container):
-                self._monitor_process_discriminated_value(monitor_spec, value, timestamp=timestamp,
-                                                          background_tasks=background_tasks)
+                if not isinstance(value, dict):
+                    continue
+                for discriminator, discriminated_value in value.items():
+                    name = monitor_spec.publish_name().replace('*', discriminator)
+                    yield monitor_spec, name, self._monitor_process_value(monitor_spec, discriminated_value)
             else:
-                value = self._monitor_process_value(monitor_spec, value)
-                self.monitor_report(monitor_spec.publish_name(), value,
-                                    timestamp=timestamp,
-                                    background_tasks=background_tasks)
+                yield monitor_spec, monitor_spec.publish_name(), \
+                    self._monitor_process_value(monitor_spec, value)
+
+    def monitors_report(self, report, timestamp=None, background_tasks=None):
+        # All the points in a report share its timestamp. With the ingest
+        # pipeline, given timestamps are left for the pipeline to normalize.
+        if not INTERESTS_MONITORS_INGEST_ENABLED or not timestamp:
+            timestamp = normalize_timestamp(timestamp)
+        for _, name, value in self._monitors_report_values(report):
+            self.monitor_report(name, value, timestamp=timestamp,
+                                background_tasks=background_tasks)
+
+    def _monitors_report_writes(self, report, timestamp, batched=None):
+        return [self.monitor_write(spec, value, name=name, timestamp=timestamp, batched=batched)
+                for spec, name, value in self._monitors_report_values(report)]
+
+    async def monitors_report_async(self, report, timestamp=None, batched=None):
+        # In-code equivalent of monitors_report, for use outside of apiserver
+        # endpoints where background_tasks are not available.
+        timestamp = normalize_timestamp(timestamp)
+        writes = self._monitors_report_writes(report, timestamp, batched=batched)
+        await asyncio.gather(*writes)
+        return len(writes)
+
+    @classmethod
+    async def monitors_report_bulk(cls, interests, reports, timestamp=None,
+                                   auth_user=None, session=None):
+        # Reports for many interests of this type, typically from a gateway
+        # reporting on behalf of its devices. reports is a dict of
+        # {interest_id: report}, and interests the corresponding interest
+        # instances, generally obtained from the library's items_by_id.
+        # Hot values and publish states are written to the cache with one
+        # pipelined write each, and datapoints are published together. The
+        # publish state reads of periodic and threshold monitors are still
+        # made per monitor.
+        for interest in interests:
+            if auth_user and not interest.check_user_access(user=auth_user, action='edit',
+                                                            session=session):
+                raise AuthorizationRequiredError(auth_user, 'edit', interest.id, interest.name)
+
+        if not INTERESTS_MONITORS_INGEST_ENABLED or not timestamp:
+            timestamp = normalize_timestamp(timestamp)
+        if INTERESTS_MONITORS_INGEST_ENABLED:
+            accepted = 0
+            for interest in interests:
+                for spec, name, value in interest._monitors_report_values(reports[interest.id]):
+                    accepted += monitor_ingest_pipeline.submit(interest, spec, value, name=name,
+                                                               timestamp=timestamp)
+            return accepted
+
+        writes = [(interest, spec, name, value) for interest in interests
+                  for spec, name, value in interest._monitors_report_values(reports[interest.id])]
+
+        # Hot values are written to the cache in one round trip.
+        hot = [x for x in writes if x[1].keep_hot]
+        old_values = transit_write_many([interest._monitor_hot_write(spec, value, name=name)
+                                         for interest, spec, name, value in hot])
+        old_values = {(interest.id, name): interest._monitor_hot_old_value(spec, old_value)
+                      for (interest, spec, name, _), old_value in zip(hot, old_values)}
+
+        publishes = [(interest, spec, name, value) for interest, spec, name, value in writes
+                     if interest._monitor_should_publish(
+                         spec, value, old_values.get((interest.id, name)), name=name)]
+        await cls._monitors_publish_many(publishes, timestamp)
+
+        transit_write_many([interest._monitor_publish_state_write(spec, value, name=name)
+                            for interest, spec, name, value in publishes
+                            if spec.tracks_publish_state])
+        return len(writes)
+
+    @staticmethod
+    async def _monitors_publish_many(publishes, timestamp):
+        # With batched publishing, datapoints go through the batcher, which is
+        # flushed once they are all in. Otherwise, they are published as
+        # individual messages, all over a single MQ channel.
+        if INTERESTS_MONITORS_PUBLISH_BATCHED:
+            await asyncio.gather(*[interest.monitor_publish(spec, value, name=name,
+                                                            timestamp=timestamp)
+                                   for interest, spec, name, value in publishes])
+            await monitor_publish_batcher.flush()
+        elif publishes:
+            await _monitors_publish_unbatched(publishes, timestamp)
 
     def _monitor_get_value(self, spec):
         kwargs = self._monitor_get_cache_loc(spec)
@@ -385,6 +599,12 @@ class InterestMonitorsMixin(InterestMixinBase):
             rv['monitors'] = monitors
         return rv
 
+    @require_permission('read', required=False)
+    def monitors_stream_filter(self, session=None):
+        # Tags identifying datapoints published by this interest on the
+        # 'im.<type>.#' topics. See _monitor_build_publish_loc.
+        return {self.type_name: str(self.name)}
+
     @require_permission('read', strip_auth=False, required=False)
     def monitors_spec_render(self, auth_user=None, session=None):
         specs = [x.render() for x in self.monitors_spec]
@@ -398,12 +618,13 @@ class InterestMonitorsMixin(InterestMixinBase):
     def _monitor_get_query(self, name,
                            spec:MonitorSpec,
                            time_span:QueryTimeSpanTModel,
-                           exporter: TimeSeriesExporter):
+                           exporter: TimeSeriesExporter,
+                           export_name=None):
         measurement, tags = self._monitor_get_publish_loc(spec, name, for_read=True)
         fields = [spec.structure]
         query = TimeSeriesQueryItemTModel(
             domain='monitors',
-            export_name=name,
+            export_name=export_name or name,
             time_span=time_span,
             measurement=measurement,
             tags=tags,
@@ -413,6 +634,21 @@ class InterestMonitorsMixin(InterestMixinBase):
         )
         return query
 
+    @staticmethod
+    def _monitors_historical_capped(query: MonitorsQueryTModel):
+        # Whether max_points actually limits the number of windows.
+        return bool(query.max_points) and query.max_points < query.time_span.window_count
+
+    @classmethod
+    def _monitors_historical_time_span(cls, query: MonitorsQueryTModel):
+        # Windowed exporters aggregate over the window of the time span. With
+        # max_points, the span is split into at most that many windows.
+        time_span = query.time_span
+        if not cls._monitors_historical_capped(query):
+            return time_span
+        return QueryTimeSpanTModel(start=time_span.start, end=time_span.end,
+                                   window_count=query.max_points)
+
     def _monitor_get_dynamic_keys_published(self, name, spec, time_span=None):
         measurement, tags = self._monitor_get_publish_loc(spec, name, for_read=True)
         tags = { k:v for k, v in tags.items() if v != '*' }
@@ -431,17 +667,99 @@ class InterestMonitorsMixin(InterestMixinBase):
         )
         return tag_query
 
+    @staticmethod
+    async def _monitor_gather_bounded(coros):
+        if not coros:
+            return []
+        semaphore = asyncio.Semaphore(INTERESTS_MONITORS_DISCOVERY_CONCURRENCY)
+
+        async def _bounded(coro):
+            async with semaphore:
+                return await coro
+
+        return await asyncio.gather(*[_bounded(x) for x in coros])
+
+    async def _monitor_discover_published_keys(self, target, spec, time_span):
+        # Discovered keys are cached per interest, target and time span, so
+        # that repeated refreshes of the same dashboard skip discovery. Open
+        # spans are keyed on their shape, aligned to the discovery TTL.
+        span_key, _ = self._monitors_time_span_key(
+            time_span, INTERESTS_MONITORS_DISCOVERY_CACHE_TTL)
+        memo_key = (self.id, spec.publish_name(), target, span_key)
+        published_keys = _discovered_keys_memo.get(memo_key)
+        if published_keys is not None:
+            return published_keys
+        logger.debug(f"Searching for published keys for {target}")
+        published_keys_query = (
+            self._monitor_get_dynamic_keys_published(target, spec, time_span=time_span))
+        published_keys = await influxdb_execute_query(published_keys_query)
+        published_keys = published_keys["data"]
+        logger.debug(f"Found {published_keys}")
+        _discovered_keys_memo.set(memo_key, published_keys)
+        return published_keys
+
+    @staticmethod
+    def _monitors_time_span_key(time_span: QueryTimeSpanTModel, head_ttl):
+        # Returns a cache key for the time span, and whether it is closed.
+        # The time span fills in the current time as the end when none is
+        # given, so spans ending within head_ttl are treated as including the
+        # open head. These are keyed on the shape of the span rather than its
+        # exact end, and aligned to buckets of head_ttl so that concurrent
+        # viewers share results.
+        end = time_span.end
+        if end.tzinfo is None or end.tzinfo.utcoffset(end) is None:
+            end = end.replace(tzinfo=pytz.utc)
+        if end < datetime.now(pytz.utc) - timedelta(seconds=head_ttl):
+            return time_span.json(), True
+        span_key = (time_span.width, time_span.window_count, time_span.window_width)
+        return (span_key, int(time.time() // head_ttl)), False
+
+    @classmethod
+    def _monitors_historical_cache_policy(cls, time_span: QueryTimeSpanTModel):
+        # Windows which closed in the past are immutable, and can be cached for
+        # a long time. Windows including the open head are cached briefly.
+        head_ttl = INTERESTS_MONITORS_HISTORICAL_HEAD_TTL
+        span_key, closed = cls._monitors_time_span_key(time_span, head_ttl)
+        if closed:
+            return span_key, INTERESTS_MONITORS_HISTORICAL_CLOSED_TTL
+        return span_key, head_ttl
+
+    @staticmethod
+    def _monitors_historical_targets_key(monitors):
+        if not monitors:
+            return None
+        rv = []
+        for target in monitors:
+            if isinstance(target, MonitorQueryItemTModel):
+                rv.append((target.name, str(target.exporter)))
+            else:
+                rv.append((target, None))
+        return tuple(rv)
+
     @require_permission('read', strip_auth=False, required=False)
     async def monitors_export_historical(self, query: MonitorsQueryTModel,
                                          auth_user=None, session=None):
-        rv = {}
-        rv['time_span'] = query.time_span
+        span_key, ttl = self._monitors_historical_cache_policy(query.time_span)
+        cache_key = (self.id, self._monitors_historical_targets_key(query.monitors),
+                     span_key, query.max_points)
+        rv = _historical_memo.get(cache_key)
+        if rv is not None:
+            return rv
+        rv = await _historical_inflight.run(
+            cache_key, lambda: self._monitors_export_historical(query)
+        )
+        _historical_memo.set(cache_key, rv, ttl=ttl)
+        return rv
+
+    async def _monitors_historical_exportable(self, query: MonitorsQueryTModel):
         exportable = []
         if not query.monitors:
             monitors = [x.publish_name() for x in self.monitors_spec
                         if x.publish_frequency > MonitorPublishFrequency.NEVER]
         else:
             monitors = query.monitors
+        targets = []
+        discoveries = []
         for target in monitors:
             if isinstance(target, MonitorQueryItemTModel):
                 exporter = target.exporter
@@ -453,31 +771,109 @@ class InterestMonitorsMixin(InterestMixinBase):
                 # TODO Check if it actually allows, clear if not
                 pass
             if not exporter:
-                exporter = spec.get_preferred_exporter()
+                if self._monitors_historical_capped(query):
+                    exporter = spec.get_downsampling_exporter()
+                else:
+                    exporter = spec.get_preferred_exporter()
             logger.debug(f"{target}, {spec.multiple_container}")
             if spec.multiple_container and '*' in target:
-                logger.debug(f"Searching for published keys for {target}")
-                published_keys_query = (
-                    self._monitor_get_dynamic_keys_published(target, spec, time_span=query.time_span))
-                published_keys = await influxdb_execute_query(published_keys_query)
-                published_keys = published_keys["data"]
-                logger.debug(f"Found {published_keys}")
-                if target.endswith('*'):
-                    prefix = target[:-1]
-                else:
+                if not target.endswith('*'):
                     raise NotImplementedError("We only support multiple container targets of type '<static>.*' here!")
-                for key in published_keys:
-                    exportable.append({'name': f"{prefix}{key}",
-                                       'spec': spec,
-                                       'exporter': exporter})
+                targets.append((target, spec, exporter, len(discoveries)))
+                discoveries.append(self._monitor_discover_published_keys(target, spec, query.time_span))
             else:
+                targets.append((target, spec, exporter, None))
+
+        discovered = await self._monitor_gather_bounded(discoveries)
+
+        for target, spec, exporter, discovery_idx in targets:
+            if discovery_idx is None:
                 exportable.append({'name': target, 'spec': spec,
                                    'exporter': exporter})
+                continue
+            prefix = target[:-1]
+            for key in discovered[discovery_idx]:
+                exportable.append({'name': f"{prefix}{key}",
+                                   'spec': spec,
+                                   'exporter': exporter})
+        return exportable
+
+    async def _monitors_export_historical(self, query: MonitorsQueryTModel):
+        rv = {}
+        rv['time_span'] = query.time_span
+        exportable = await self._monitors_historical_exportable(query)
+        time_span = self._monitors_historical_time_span(query)
 
         query_planner = TimeSeriesQueryPlanner()
         for item in exportable:
-            query_planner.add_item(self._monitor_get_query(item['name'], item['spec'], query.time_span, item['exporter']))
+            query_planner.add_item(self._monitor_get_query(item['name'], item['spec'], time_span,
+                                                           item['exporter']))
 
         data = await tsdb_execute_query_plan(query_planner)
         rv['data'] = data['monitors']
         return rv
+
+    @classmethod
+    async def monitors_export_historical_multi(cls, interests, query: MonitorsQueryTModel,
+                                               auth_user=None, session=None):
+        # Historical monitors for many interests of this type, typically siblings
+        # for fleet views. Items are grouped by measurement, tag shape, fields and
+        # exporter, and each group is fetched with a single query filtering on
+        # the tag values of all its interests. Exporters which need per series
+        # post-processing are run through a query plan instead.
+        for interest in interests:
+            if auth_user and not interest.check_user_access(user=auth_user, action='read',
+                                                            session=session):
+                raise AuthorizationRequiredError(auth_user, 'read', interest.id, interest.name)
+
+        exportables = await cls._monitor_gather_bounded(
+            [x._monitors_historical_exportable(query) for x in interests]
+        )
+
+        time_span = cls._monitors_historical_time_span(query)
+        groups = {}
+        for interest, exportable in zip(interests, exportables):
+            for item in exportable:
+                item_query = interest._monitor_get_query(
+                    item['name'], item['spec'], time_span, item['exporter'],
+                    export_name=f"{interest.id}:{item['name']}"
+                )
+                group_key = (item_query.measurement, tuple(sorted(item_query.tags.keys())),
+                             tuple(item_query.fields), item_query.exporter,
+                             item_query.include_ends)
+                groups.setdefault(group_key, []).append(item_query)
+
+        builders = []
+        query_planner = None
+        for group_key, items in groups.items():
+            if GroupedMonitorsFluxQueryBuilder.supports(group_key[3]):
+                builders.append(GroupedMonitorsFluxQueryBuilder(items))
+                continue
+            if not query_planner:
+                query_planner = TimeSeriesQueryPlanner()
+            for item_query in items:
+                query_planner.add_item(item_query)
+
+        results = {}
+        responses = await cls._monitor_gather_bounded(
+            [influxdb_execute_query(x) for x in builders]
+        )
+        for response in responses:
+            for export_name, series in response['data'].items():
+                results[export_name] = {'strategy': response['strategy'],
+                                        'columns': ['_time', export_name.split(':', 1)[1]],
+                                        'data': series}
+        if query_planner:
+            data = await tsdb_execute_query_plan(query_planner)
+            results.update(data.get('monitors', {}))
+
+        rv = {'time_span': query.time_span,
+              'data': {x.id: {} for x in interests}}
+        for export_name, value in results.items():
+            if ':' not in export_name:
+                logger.warning(f"Could not attribute historical monitor result "
+                               f"'{export_name}' to an interest")
+                continue
+            interest_id, name = export_name.split(':', 1)
+            rv['data'][int(interest_id)][name] = value
+        return rv
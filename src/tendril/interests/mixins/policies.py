@@ -11,6 +11,14 @@ from tendril.common.states import LifecycleStatus
 from tendril.db.controllers.interests_policies import get_policy
 from tendril.db.controllers.interests_policies import upsert_policy
 from tendril.db.controllers.interests_policies import clear_policy
+from tendril.db.controllers.interests_policies import get_policy_chain
+from tendril.db.controllers.interests_policies import get_effective_policies
+from tendril.db.controllers.interests_policies import write_effective_policies
+from tendril.db.controllers.interests_policies import clear_effective_policies
+from tendril.db.controllers.interests_policies import materialize_effective_policy
+from tendril.common.interests.caching import register_hierarchy_listener
+
+from tendril.config import INTERESTS_POLICIES_MATERIALIZED
 
 from tendril.common.interests.exceptions import AuthorizationRequiredError
 
@@ -19,28 +27,42 @@ from tendril.utils import log
 logger = log.get_logger(__name__)
 
 
+def _policies_hierarchy_changed(interest_id=None):
+    # Materialized policies of a newly linked interest and its descendants
+    # may now be wrong. They are removed here, once the link is committed,
+    # and rebuilt as they are read. Renames do not affect policies.
+    try:
+        clear_effective_policies(interest=interest_id)
+    except Exception as e:
+        logger.error(f"Could not clear materialized policies below {interest_id} : {e}")
+
+
+if INTERESTS_POLICIES_MATERIALIZED:
+    register_hierarchy_listener(_policies_hierarchy_changed, renames=False)
+
+
 class InterestPoliciesMixin(InterestMixinBase):
     def policies_assignable(self):
         return policies.assignable_templates(self.type_name)
 
     def policies_types(self):
-        rv = {}
-        for x in self.policies_assignable():
-            rv[x.name] = x
-        return rv
+        return policies.assignable_types(self.type_name)
 
     def policies_spec(self):
-        rv = {}
-        for x in self.policies_assignable():
-            rv[x.name] = x.render_spec()
-        return rv
+        return policies.rendered_specs(self.type_name)
+
+    def policies_spec_json(self):
+        return policies.rendered_specs_json(self.type_name)
 
     @with_db
-    def policies_current(self, auth_user=None, session=None):
-        rv = {}
-        for x in self.policies_assignable():
-            rv[x.name] = self.policy_get(x.name, auth_user=auth_user, session=session)
-        return rv
+    @require_permission('read_policies', strip_auth=True, required=False)
+    def policies_current(self, session=None):
+        return self._policies_resolve([x.name for x in self.policies_assignable()],
+                                      session=session)
+
+    @staticmethod
+    def _policy_inheriting_types(context_spec):
+        return {x['interest_type'] for x in context_spec if x['inherits_from'] == 'ancestors'}
 
     def _policy_context_check_inherits(self, context_spec):
         for spec in context_spec:
@@ -48,36 +70,81 @@ class InterestPoliciesMixin(InterestMixinBase):
                 return True
         return False
 
+    def _policies_clear_cache(self):
+        self._policies_resolved = {}
+
+    @with_db
+    def _policies_resolve(self, names, session=None):
+        # Resolves the named policies from a single query across the interest
+        # and its ancestors, taking the nearest definition of each. Ancestor
+        # definitions are only used for policy types which inherit for this
+        # interest type. Results are cached on the instance, which generally
+        # lives only as long as the request.
+        # When materialization is enabled, materialized policies are used
+        # where available, and the rest are materialized once resolved.
+        if not hasattr(self, '_policies_resolved'):
+            self._policies_clear_cache()
+        missing = [x for x in names if x not in self._policies_resolved]
+        if missing and INTERESTS_POLICIES_MATERIALIZED:
+            for _, name, policy, _ in get_effective_policies([self.id], policy_types=missing,
+                                                             session=session):
+                self._policies_resolved[name] = policy
+            missing = [x for x in missing if x not in self._policies_resolved]
+        if missing:
+            types = self.policies_types()
+            inheritable = {x for x in missing if x in types and
+                           self._policy_context_check_inherits(types[x].context_spec)}
+            resolved = {}
+            for source, depth, name, policy in get_policy_chain(self.id, policy_types=missing,
+                                                                session=session):
+                if name in resolved or (depth and name not in inheritable):
+                    continue
+                resolved[name] = (source, policy)
+            for name in missing:
+                if name not in resolved and name not in types:
+                    logger.warn(f"Could not find policy type '{name}' for interest type '{self.type_name}'")
+                self._policies_resolved[name] = resolved.get(name, (None, None))[1]
+            if INTERESTS_POLICIES_MATERIALIZED:
+                write_effective_policies(
+                    [(self.id, name) + resolved.get(name, (None, None))
+                     for name in missing if name in types],
+                    overwrite=False, session=session
+                )
+        return {x: self._policies_resolved[x] for x in names}
+
+    @classmethod
+    def policies_effective_multi(cls, interests, names=None, auth_user=None, session=None):
+        # Effective policies for many interests of this type. With
+        # materialization enabled, these are read for all the interests in a
+        # single query, and only the missing ones are resolved individually.
+        for interest in interests:
+            if auth_user and not interest.check_user_access(user=auth_user, action='read_policies',
+                                                            session=session):
+                raise AuthorizationRequiredError(auth_user, 'read_policies',
+                                                 interest.id, interest.name)
+        if INTERESTS_POLICIES_MATERIALIZED:
+            by_id = {x.id: x for x in interests}
+            for interest in interests:
+                interest._policies_clear_cache()
+            for interest_id, name, policy, _ in get_effective_policies(list(by_id.keys()),
+                                                                       policy_types=names,
+                                                                       session=session):
+                by_id[interest_id]._policies_resolved[name] = policy
+        rv = {}
+        for interest in interests:
+            interest_names = names or [x.name for x in interest.policies_assignable()]
+            rv[interest.id] = interest._policies_resolve(interest_names, session=session)
+        return rv
+
     @with_db
     @require_permission('read_policies', strip_auth=True, required=False)
     def policy_get(self, name, resolve_ancestors=True, session=None):
-        policy = get_policy(policy_type=name, interest=self.id, session=session)
-        if policy:
-            return policy.policy
-
         if not resolve_ancestors:
-            return None
-
-        try:
-            spec: PolicyBase = self.policies_types()[name]
-        except KeyError:
-            logger.warn(f"Could not find policy type '{name}' for interest type '{self.type_name}'")
-            return None
-
-        inherit = self._policy_context_check_inherits(spec.context_spec)
-
-        if not inherit:
-            return None
-
-        for ancestor in self.ancestors(session=session):
-            try:
-                policy = ancestor.policy_get(name, resolve_ancestors=False, session=session)
-            except AttributeError:
-                continue
+            policy = get_policy(policy_type=name, interest=self.id, session=session)
             if policy:
-                return policy
-
-        return None
+                return policy.policy
+            return None
+        return self._policies_resolve([name], session=session)[name]
 
     @with_db
     def _policy_check_auth_context(self, spec, context, auth_user, session=None):
@@ -109,10 +176,15 @@ class InterestPoliciesMixin(InterestMixinBase):
             raise AuthorizationRequiredError(user_id=auth_user, action=f"policy_set:{name}",
                                              interest_id=self.id, interest_name=self.name)
 
+        self._policies_clear_cache()
         if not policy:
             result = clear_policy(policy_type=name, interest=self.id, session=session)
-            return result
+        else:
+            result = upsert_policy(policy_type=name, interest=self.id, user=auth_user,
+                                   policy=spec.schema(**policy).dict(), session=session)
 
-        result = upsert_policy(policy_type=name, interest=self.id, user=auth_user,
-                               policy=spec.schema(**policy).dict(), session=session)
+        if INTERESTS_POLICIES_MATERIALIZED:
+            materialize_effective_policy(self.id, self.type_name, name,
+                                         self._policy_inheriting_types(spec.context_spec),
+                                         session=session)
         return result
@@ -83,6 +83,15 @@ class GenericInterestLibrary(object):
                 id = '<unspecified>'
             raise InterestNotFound(type_name=self.type_name, name=name, id=id)
 
+    @with_db
+    def items_by_id(self, ids, session=None):
+        found = {x.id: x for x in get_interests(type=self.interest_class,
+                                                ids=ids, session=session)}
+        for id in ids:
+            if id not in found.keys():
+                raise InterestNotFound(type_name=self.type_name, name='<unspecified>', id=id)
+        return [self.interest_class(found[x]) for x in ids]
+
     @with_db
     def add_item(self, item, session=None):
         if item.type != self.interest_class.model.type_name:
@@ -0,0 +1,153 @@
+
+
+import time
+import asyncio
+from typing import NamedTuple
+from typing import Any
+
+from tendril.monitors.spec import MonitorSpec
+from tendril.monitors.spec import MonitorExportLevel
+from tendril.monitors.timestamps import now_ns
+from tendril.monitors.timestamps import normalize_timestamps
+
+from tendril.config import INTERESTS_MONITORS_INGEST_QUEUE_SIZE
+from tendril.config import INTERESTS_MONITORS_INGEST_WORKERS
+from tendril.config import INTERESTS_MONITORS_INGEST_BATCH_SIZE
+from tendril.config import INTERESTS_MONITORS_INGEST_SHED_THRESHOLD
+from tendril.config import INTERESTS_MONITORS_INGEST_SHED_LEVEL
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+class MonitorIngestJob(NamedTuple):
+    interest: Any
+    spec: MonitorSpec
+    value: Any
+    name: str
+    timestamp: Any
+    enqueued: float
+
+
+class MonitorIngestPipeline(object):
+    # Bounded queue of monitor writes, drained by a fixed pool of workers.
+    # When the queue fills beyond the shed threshold, writes for monitors
+    # with an export level above the shed level are dropped, so that the
+    # remaining capacity is kept for the more important monitors. Once the
+    # queue is full, all new writes are dropped.
+    def __init__(self, maxsize=10000, workers=4, batch_size=100,
+                 shed_threshold=0.8, shed_level=MonitorExportLevel.NORMAL):
+        self.maxsize = maxsize
+        self.workers = workers
+        self.batch_size = batch_size
+        self.shed_depth = int(maxsize * shed_threshold)
+        self.shed_level = shed_level
+        self._queue = None
+        self._workers = []
+        self._reset_metrics()
+
+    def _reset_metrics(self):
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = {x.name: 0 for x in MonitorExportLevel}
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._workers = [x for x in self._workers if not x.done()]
+        if len(self._workers) < self.workers:
+            loop = asyncio.get_running_loop()
+            for _ in range(self.workers - len(self._workers)):
+                self._workers.append(loop.create_task(self._worker()))
+
+    def _drop(self, spec):
+        self.dropped[MonitorExportLevel(spec.export_level).name] += 1
+        return False
+
+    def submit(self, interest, spec, value, name=None, timestamp=None):
+        # Needs to be called from within the running event loop. Returns
+        # whether the write was accepted. Timestamps are enqueued as received
+        # and normalized a batch at a time by the workers. Missing timestamps
+        # are taken at submission, not when the write is processed.
+        self._ensure_started()
+        if self._queue.qsize() >= self.shed_depth and spec.export_level > self.shed_level:
+            return self._drop(spec)
+        job = MonitorIngestJob(interest, spec, value, name or spec.publish_name(),
+                               timestamp or now_ns(), time.monotonic())
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            return self._drop(spec)
+        self.enqueued += 1
+        return True
+
+    def _next_batch(self, first):
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _process(self, batch):
+        timestamps = normalize_timestamps([job.timestamp for job in batch])
+        results = await asyncio.gather(
+            *[job.interest.monitor_write(job.spec, job.value, name=job.name,
+                                         timestamp=timestamp)
+              for job, timestamp in zip(batch, timestamps)],
+            return_exceptions=True
+        )
+        now = time.monotonic()
+        for job, result in zip(batch, results):
+            latency = now - job.enqueued
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+            if isinstance(result, Exception):
+                self.failed += 1
+                logger.error(f"Monitor write failed for {job.interest.type_name} "
+                             f"{job.interest.id} '{job.name}' : {result}")
+            else:
+                self.processed += 1
+
+    async def _worker(self):
+        while True:
+            batch = self._next_batch(await self._queue.get())
+            try:
+                await self._process(batch)
+            except Exception as e:
+                logger.error(f"Monitor ingest worker could not process a batch "
+                             f"of {len(batch)} writes : {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    async def drain(self):
+        if self._queue is not None:
+            await self._queue.join()
+
+    def metrics(self):
+        completed = self.processed + self.failed
+        return {
+            'depth': self._queue.qsize() if self._queue else 0,
+            'maxsize': self.maxsize,
+            'workers': len([x for x in self._workers if not x.done()]),
+            'enqueued': self.enqueued,
+            'processed': self.processed,
+            'failed': self.failed,
+            'dropped': dict(self.dropped),
+            'latency_avg': self.latency_total / completed if completed else None,
+            'latency_max': self.latency_max,
+        }
+
+
+monitor_ingest_pipeline = MonitorIngestPipeline(
+    maxsize=INTERESTS_MONITORS_INGEST_QUEUE_SIZE,
+    workers=INTERESTS_MONITORS_INGEST_WORKERS,
+    batch_size=INTERESTS_MONITORS_INGEST_BATCH_SIZE,
+    shed_threshold=INTERESTS_MONITORS_INGEST_SHED_THRESHOLD,
+    shed_level=MonitorExportLevel[INTERESTS_MONITORS_INGEST_SHED_LEVEL],
+)
@@ -0,0 +1,79 @@
+
+
+import asyncio
+
+from tendril.core.mq.aio import with_mq_client
+from tendril.monitors.spec import encode_publish_point
+
+from tendril.config import INTERESTS_MONITORS_PUBLISH_BATCHED
+from tendril.config import INTERESTS_MONITORS_PUBLISH_BATCH_SIZE
+from tendril.config import INTERESTS_MONITORS_PUBLISH_BATCH_DELAY
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+@with_mq_client()
+async def publish_points(key, points, mq=None):
+    # A single datapoint is published as is, so that the message is
+    # identical to the unbatched case. Multiple datapoints are published
+    # as a list of the same datapoint dicts on the same routing key, so the
+    # 'monitors_raw' work queue binding ('im.#') remains unchanged.
+    if len(points) == 1:
+        msg = encode_publish_point(points[0])
+    else:
+        msg = '[' + ', '.join(map(encode_publish_point, points)) + ']'
+    await mq.publish(key, msg)
+
+
+class MonitorPublishBatcher(object):
+    def __init__(self, max_points=100, max_delay=10):
+        self.max_points = max_points
+        self.max_delay = max_delay / 1000
+        self._buffers = {}
+        self._flushers = {}
+
+    async def add(self, key, point):
+        buffer = self._buffers.setdefault(key, [])
+        buffer.append(point)
+        if len(buffer) >= self.max_points:
+            await self.flush(key)
+        elif key not in self._flushers:
+            self._flushers[key] = asyncio.create_task(self._delayed_flush(key))
+
+    async def _delayed_flush(self, key):
+        await asyncio.sleep(self.max_delay)
+        self._flushers.pop(key, None)
+        await self.flush(key)
+
+    async def flush(self, key=None):
+        if key is None:
+            for key in list(self._buffers.keys()):
+                await self.flush(key)
+            return
+        points = self._buffers.pop(key, None)
+        flusher = self._flushers.pop(key, None)
+        if flusher and flusher is not asyncio.current_task():
+            flusher.cancel()
+        if not points:
+            return
+        try:
+            await publish_points(key, points)
+        except Exception as e:
+            logger.error(f"Could not publish {len(points)} buffered datapoints "
+                         f"to '{key}' : {e}")
+
+
+monitor_publish_batcher = MonitorPublishBatcher(
+    max_points=INTERESTS_MONITORS_PUBLISH_BATCH_SIZE,
+    max_delay=INTERESTS_MONITORS_PUBLISH_BATCH_DELAY,
+)
+
+
+async def publish_point(key, point, batched=None):
+    if batched is None:
+        batched = INTERESTS_MONITORS_PUBLISH_BATCHED
+    if batched:
+        await monitor_publish_batcher.add(key, point)
+    else:
+        await publish_points(key, [point])
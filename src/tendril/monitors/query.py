@@ -0,0 +1,124 @@
+
+
+import polars
+
+from tendril.core.tsdb.constants import TimeSeriesExporter
+from tendril.connectors.influxdb.query.builder import InfluxDBFluxQueryBuilderBase
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+_windowed_aggregators = {
+    'WINDOWED_MEAN': 'mean',
+    'WINDOWED_SUM': 'sum',
+    'WINDOWED_SUMMATION': 'sum',
+    'WINDOWED_COUNT': 'count',
+}
+
+
+def _flux_string(value):
+    return '"{0}"'.format(str(value).replace('\\', '\\\\').replace('"', '\\"'))
+
+
+class GroupedMonitorsFluxQueryBuilder(InfluxDBFluxQueryBuilderBase):
+    # A single query for the same monitor across many interests. The items
+    # share the measurement, field, exporter and time span, and differ only
+    # in the values of some of their tags. Tags common to all the items are
+    # filtered on directly, and the rest are filtered with one multi-valued
+    # filter. The response is split back into one series per item.
+    want_data_frame = True
+
+    def __init__(self, items):
+        super().__init__()
+        first = items[0]
+        self._exporter = first.exporter
+        self._include_ends = first.include_ends
+        self.bucket = first.domain
+        self.time_span = first.time_span
+
+        common = dict(first.tags)
+        for item in items[1:]:
+            common = {k: v for k, v in common.items() if item.tags.get(k) == v}
+        self._keys = sorted({k for item in items for k in item.tags} - common.keys())
+
+        self.simple_filter('_measurement', first.measurement)
+        for key, value in common.items():
+            self.simple_filter(key, value)
+        for field in first.fields:
+            self.simple_filter('_field', field)
+
+        self._series = {}
+        for item in items:
+            series = tuple(str(item.tags[k]) for k in self._keys)
+            self._series.setdefault(series, []).append(item.export_name)
+
+    @classmethod
+    def supports(cls, exporter):
+        return exporter == TimeSeriesExporter.RAW or exporter.value in _windowed_aggregators
+
+    @property
+    def strategy(self):
+        return self._exporter
+
+    @property
+    def response_columns(self):
+        return ['_time', '_value']
+
+    def _render_series_filter(self):
+        if not self._keys:
+            return ''
+        if len(self._keys) == 1:
+            values = ', '.join(_flux_string(x[0]) for x in self._series)
+            return (f' |> filter(fn: (r) => contains(value: r[{_flux_string(self._keys[0])}], '
+                    f'set: [{values}]))\n')
+        clauses = []
+        for series in self._series:
+            clauses.append(' and '.join(f'r[{_flux_string(k)}] == {_flux_string(v)}'
+                                        for k, v in zip(self._keys, series)))
+        return ' |> filter(fn: (r) => ' + ' or '.join(f'({x})' for x in clauses) + ')\n'
+
+    def _render_series(self, range=None):
+        return self._render_selectors(range=range) + self._render_series_filter()
+
+    def _render_aggregator(self):
+        aggregator = _windowed_aggregators.get(self._exporter.value)
+        if not aggregator:
+            return ''
+        every = max(int(self.time_span.window_width.total_seconds()), 1)
+        rv = f' |> aggregateWindow(every: {every}s, fn: {aggregator}, createEmpty: false)\n'
+        rv += ' |> toFloat()\n'
+        return rv
+
+    def build(self):
+        rv = ''
+        if self._include_ends:
+            rv += 'openValue = ' + self._render_series(range='before')
+            rv += ' |> last()\n'
+            if self._exporter.value in _windowed_aggregators:
+                rv += ' |> toFloat()\n'
+            rv += '\n'
+        rv += 'rangeValues = ' + self._render_series()
+        rv += self._render_aggregator()
+        rv += '\n'
+        if self._include_ends:
+            rv += 'union(tables: [openValue, rangeValues])\n'
+        else:
+            rv += 'rangeValues\n'
+        columns = ', '.join(_flux_string(x) for x in ['_time', '_value'] + self._keys)
+        rv += f' |> keep(columns: [{columns}])\n'
+        rv += ' |> group()\n'
+        rv += ' |> sort(columns: ["_time"], desc: false)\n'
+        return rv
+
+    def repacker(self, response):
+        rv = {name: [] for names in self._series.values() for name in names}
+        frames = response if isinstance(response, list) else [response]
+        for frame in frames:
+            df = polars.from_pandas(frame)
+            if '_value' not in df.columns:
+                continue
+            for row in df.select(['_time', '_value'] + self._keys).iter_rows():
+                for name in self._series.get(tuple(str(x) for x in row[2:]), []):
+                    rv[name].append((row[0], row[1]))
+        return rv
@@ -0,0 +1,92 @@
+
+
+import asyncio
+from uuid import uuid4
+
+from tendril.common.states import LifecycleStatus
+from tendril.monitors.spec import periodic_publish_frequencies
+from tendril.utils.db import get_session
+from tendril.caching import transit
+
+from tendril.config import INTERESTS_MONITORS_HEARTBEAT_INTERVAL
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+def _heartbeat_libraries():
+    from tendril.libraries import interests
+    from tendril.interests.mixins.monitors import InterestMonitorsMixin
+    for library_name in interests.libraries:
+        library = getattr(interests, library_name)
+        if not issubclass(library.interest_class, InterestMonitorsMixin):
+            continue
+        if not any(x.publish_frequency in periodic_publish_frequencies
+                   for x in library.interest_class.monitors_spec):
+            continue
+        yield library
+
+
+async def monitors_heartbeat():
+    for library in _heartbeat_libraries():
+        with get_session() as session:
+            items = library.items(state=LifecycleStatus.ACTIVE, session=session)
+            for item in items:
+                try:
+                    await item.monitors_heartbeat()
+                except Exception as e:
+                    logger.error(f"Monitors heartbeat failed for "
+                                 f"{item.type_name} {item.id} : {e}")
+
+
+def _decode(value):
+    if isinstance(value, bytes):
+        return value.decode()
+    return value
+
+
+class HeartbeatLease(object):
+    # Lease in the transit cache, so that only one of the processes running
+    # the scheduler publishes heartbeats at a time. The holder renews the
+    # lease every run. If it goes away, another process takes over once the
+    # lease expires. Two processes racing for a free lease may both run
+    # once, after which only the last writer holds it.
+    namespace = 'imhb'
+    key = 'lease'
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.token = uuid4().hex
+
+    def acquire(self):
+        owner = transit.read(namespace=self.namespace, key=self.key, deser=_decode)
+        if owner and owner != self.token:
+            return False
+        previous = transit.write(self.token, namespace=self.namespace, key=self.key,
+                                 ttl=self.ttl, ser=str, get=True)
+        return _decode(previous) in (None, self.token)
+
+
+async def run_monitors_heartbeat(interval=None):
+    interval = interval or INTERESTS_MONITORS_HEARTBEAT_INTERVAL
+    lease = HeartbeatLease(ttl=2 * interval + 5)
+    logger.info(f"Starting the monitors heartbeat scheduler with interval {interval}s")
+    while True:
+        try:
+            if lease.acquire():
+                await monitors_heartbeat()
+        except Exception as e:
+            logger.error(f"Monitors heartbeat run failed : {e}")
+        await asyncio.sleep(interval)
+
+
+_heartbeat_task = None
+
+
+def start_monitors_heartbeat(interval=None):
+    # Needs to be called from within a running event loop, generally from
+    # the startup hooks of the component which is responsible for monitors.
+    global _heartbeat_task
+    if _heartbeat_task is None or _heartbeat_task.done():
+        _heartbeat_task = asyncio.get_running_loop().create_task(run_monitors_heartbeat(interval))
+    return _heartbeat_task
@@ -66,6 +66,55 @@ class DecimalEncoder(json.JSONEncoder):
         return super().encode(obj)
 
 
+def _encode_unit(value):
+    return encode_scalar(value.value)
+
+
+_scalar_encoders = {
+    str: json.dumps,
+    int: int.__repr__,
+    float: json.dumps,
+    bool: lambda x: 'true' if x else 'false',
+    type(None): lambda x: 'null',
+    Decimal: lambda x: f'{x:f}',
+    timedelta: lambda x: repr(x.total_seconds()),
+    datetime: lambda x: repr(x.timestamp()),
+}
+
+
+def encode_scalar(value):
+    # Exact type lookup first, since this is on the hot path for every
+    # published datapoint. Subclasses (units, etc.) fall through to the
+    # isinstance checks and ultimately to the DecimalEncoder.
+    encoder = _scalar_encoders.get(type(value), None)
+    if encoder:
+        return encoder(value)
+    if isinstance(value, NumericalUnitBase):
+        return _encode_unit(value)
+    for vtype in (bool, Decimal, datetime, timedelta, int, float, str):
+        if isinstance(value, vtype):
+            return _scalar_encoders[vtype](value)
+    return DecimalEncoder().encode(value)
+
+
+def _encode_mapping(mapping):
+    return ', '.join(f'{json.dumps(k)}: {encode_scalar(v)}' for k, v in mapping.items())
+
+
+def encode_publish_point(point):
+    # Serializer for the fixed monitor publish envelope. This produces the
+    # same JSON as the DecimalEncoder for these messages, but without the
+    # recursive string building. Tag values keep their types, as they did
+    # with the DecimalEncoder.
+    timestamp = point['timestamp']
+    if type(timestamp) is not int:
+        timestamp = encode_scalar(timestamp)
+    return (f'{{"measurement": {json.dumps(point["measurement"])}, '
+            f'"tags": {{{_encode_mapping(point["tags"])}}}, '
+            f'"fields": {{{_encode_mapping(point["fields"])}}}, '
+            f'"timestamp": {timestamp}}}')
+
+
 class MonitorExportLevel(IntEnum):
     STUB = 1
     NORMAL = 2
@@ -75,13 +124,25 @@ class MonitorExportLevel(IntEnum):
 
 class MonitorPublishFrequency(IntEnum):
     NEVER = 1
-    PERIODIC = 2                       # Not actually implemented
+    PERIODIC = 2
     ALWAYS = 3
 
     ONCHANGE = 4
-    ONCHANGE_OR_PERIODIC = 5           # Not actually implemented
-    ONCHANGE_THESHOLD = 6              # Not actually implemented
-    ONCHANGE_THESHOLD_OR_PERIODIC = 7  # Not actually implemented
+    ONCHANGE_OR_PERIODIC = 5
+    ONCHANGE_THESHOLD = 6
+    ONCHANGE_THESHOLD_OR_PERIODIC = 7
+
+
+periodic_publish_frequencies = (
+    MonitorPublishFrequency.PERIODIC,
+    MonitorPublishFrequency.ONCHANGE_OR_PERIODIC,
+    MonitorPublishFrequency.ONCHANGE_THESHOLD_OR_PERIODIC,
+)
+
+threshold_publish_frequencies = (
+    MonitorPublishFrequency.ONCHANGE_THESHOLD,
+    MonitorPublishFrequency.ONCHANGE_THESHOLD_OR_PERIODIC,
+)
 
 
 class MonitorSpec(NamedTuple):
@@ -112,6 +173,9 @@ class MonitorSpec(NamedTuple):
 
     publish_frequency: Optional[MonitorPublishFrequency] = MonitorPublishFrequency.ONCHANGE
     publish_period: Optional[int] = 1800
+    # Minimum absolute change from the last published value needed to publish
+    # with the ONCHANGE_THESHOLD frequencies. Without one, any change is published.
+    publish_threshold: Optional[Any] = None
     publish_measurement: Optional[Union[str, Callable[[str], str]]] = lambda x: x
 
     @property
@@ -126,8 +190,16 @@ class MonitorSpec(NamedTuple):
             return True
         if self.publish_frequency > MonitorPublishFrequency.ALWAYS:
             return True
+        if self.publish_frequency == MonitorPublishFrequency.PERIODIC:
+            # Periodic publishing needs the current value for heartbeats
+            return True
         return False
 
+    @property
+    def tracks_publish_state(self):
+        return (self.publish_frequency in periodic_publish_frequencies or
+                self.publish_frequency in threshold_publish_frequencies)
+
     def publish_name(self):
         return self.export_name or self.path
 
@@ -180,6 +252,22 @@ class MonitorSpec(NamedTuple):
                 return TimeSeriesExporter.WINDOWED_MEAN
         raise ValueError(f"No preferred exported found for {self.publish_name()}")
 
+    def get_downsampling_exporter(self):
+        # Exporter used when the number of points to be returned is capped
+        # and the data has to be aggregated into windows.
+        fundamental_type = self.get_fundamental_type()
+        if fundamental_type is not TimeSeriesFundamentalType.NUMERIC:
+            return TimeSeriesExporter.CHANGES_ONLY
+        if self.is_constant:
+            return TimeSeriesExporter.CHANGES_ONLY
+        if self.is_cumulative:
+            return TimeSeriesExporter.WINDOWED_SUMMATION
+        if self.is_monotonic:
+            return TimeSeriesExporter.DISCONTINUITIES_ONLY
+        if self.is_continuous:
+            return TimeSeriesExporter.WINDOWED_MEAN
+        return self.get_preferred_exporter()
+
     def render(self):
         # TODO These names may need to use better terminology
         # is_cumulative:
@@ -201,6 +289,7 @@ class MonitorSpec(NamedTuple):
         return {
             'publish_name': self.publish_name(),
             'publish_frequency': self.publish_frequency,
+            'publish_period': self.publish_period,
             'publish_measurement': self.measurement_name(self.publish_name()),
             'export_level': self.export_level,
             'fundamental_type': self.get_fundamental_type(),
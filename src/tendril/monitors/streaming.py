@@ -0,0 +1,146 @@
+
+
+import json
+import asyncio
+
+from tendril.core.mq.aio import with_mq_client
+from tendril.monitors.spec import encode_publish_point
+
+from tendril.config import INTERESTS_MONITORS_STREAM_QUEUE_SIZE
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+class MonitorStreamSubscription(object):
+    def __init__(self, hub, type_name, tags, maxsize):
+        self.hub = hub
+        self.type_name = type_name
+        self.tags = tags
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+        self._last = {}
+
+    def matches(self, point):
+        tags = point.get('tags', {})
+        return all(tags.get(k) == v for k, v in self.tags.items())
+
+    def offer(self, point):
+        try:
+            self.queue.put_nowait(point)
+        except asyncio.QueueFull:
+            # Slow clients lose datapoints instead of holding up the
+            # shared subscription.
+            self.dropped += 1
+
+    def is_delta(self, point):
+        series = (point['measurement'], tuple(sorted(point['tags'].items())))
+        if self._last.get(series) == point['fields']:
+            return False
+        self._last[series] = point['fields']
+        return True
+
+    async def get(self, timeout=None):
+        while True:
+            point = await asyncio.wait_for(self.queue.get(), timeout=timeout)
+            if self.is_delta(point):
+                return point
+
+    def close(self):
+        self.hub.unsubscribe(self)
+
+
+class MonitorStreamHub(object):
+    # One broker subscription per interest type per worker, fanned out to
+    # all the connected clients interested in that type. Consumers which
+    # fail are restarted after a delay while there are still subscribers.
+    def __init__(self, maxsize=100, retry_delay=5):
+        self.maxsize = maxsize
+        self.retry_delay = retry_delay
+        self._subscriptions = {}
+        self._consumers = {}
+
+    def subscribe(self, type_name, tags):
+        subscription = MonitorStreamSubscription(self, type_name, tags, self.maxsize)
+        self._subscriptions.setdefault(type_name, set()).add(subscription)
+        self._ensure_consumer(type_name)
+        return subscription
+
+    def _ensure_consumer(self, type_name):
+        if not self._subscriptions.get(type_name):
+            return
+        consumer = self._consumers.get(type_name)
+        if consumer is not None and not consumer.done():
+            return
+        consumer = asyncio.create_task(self._consume(type_name))
+        consumer.add_done_callback(lambda t: self._consumer_done(type_name, t))
+        self._consumers[type_name] = consumer
+
+    def _consumer_done(self, type_name, task):
+        if self._consumers.get(type_name) is task:
+            del self._consumers[type_name]
+        if task.cancelled():
+            return
+        e = task.exception()
+        if e:
+            logger.error(f"Monitor stream consumer for '{type_name}' failed : {e}")
+        else:
+            logger.warning(f"Monitor stream consumer for '{type_name}' stopped")
+        if self._subscriptions.get(type_name):
+            asyncio.get_running_loop().call_later(self.retry_delay,
+                                                  self._ensure_consumer, type_name)
+
+    def unsubscribe(self, subscription):
+        subscriptions = self._subscriptions.get(subscription.type_name, set())
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            consumer = self._consumers.pop(subscription.type_name, None)
+            if consumer:
+                consumer.cancel()
+
+    def _dispatch(self, type_name, body):
+        points = json.loads(body)
+        if isinstance(points, dict):
+            points = [points]
+        for subscription in list(self._subscriptions.get(type_name, [])):
+            for point in points:
+                if subscription.matches(point):
+                    subscription.offer(point)
+
+    @with_mq_client()
+    async def _consume(self, type_name, mq=None):
+        # Stream fan-out uses a server named, exclusive, auto-delete queue
+        # rather than a durable work queue, so that the broker removes it
+        # when the consumer stops or the worker's connection goes away.
+        # The expiry covers queues which are never consumed from.
+        logger.info(f"Subscribing to 'im.{type_name}.#' for live monitor streams")
+        queue = await mq.channel.declare_queue(
+            exclusive=True, auto_delete=True,
+            arguments={'x-expires': self.retry_delay * 2000 + 60000}
+        )
+        await queue.bind(await mq.exchange(), routing_key=f'im.{type_name}.#')
+        async with queue.iterator() as messages:
+            async for message in messages:
+                async with message.process():
+                    try:
+                        self._dispatch(type_name, message.body)
+                    except Exception as e:
+                        logger.warning(f"Could not dispatch monitor stream message : {e}")
+
+monitor_stream_hub = MonitorStreamHub(maxsize=INTERESTS_MONITORS_STREAM_QUEUE_SIZE)
+
+
+async def monitor_stream_events(type_name, tags, is_disconnected, keepalive=15):
+    # Server-Sent Events for a monitor stream. The subscription is only made
+    # once the response is actually iterated, so that it is always released.
+    subscription = monitor_stream_hub.subscribe(type_name, tags)
+    try:
+        while not await is_disconnected():
+            try:
+                point = await subscription.get(timeout=keepalive)
+            except asyncio.TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            yield f'event: monitor\ndata: {encode_publish_point(point)}\n\n'
+    finally:
+        subscription.close()
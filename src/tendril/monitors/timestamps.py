@@ -0,0 +1,95 @@
+
+
+import time
+import pytz
+import polars
+from datetime import datetime
+from datetime import timezone
+
+from tendril.config import INTERESTS_MONITORS_TIMESTAMP_POLICY
+from tendril.config import INTERESTS_MONITORS_LOCAL_TZ
+
+from tendril.utils import log
+logger = log.get_logger(__name__)
+
+
+# Monitor timestamps are stored as integer ns since the epoch. Naive datetimes
+# are assumed to be in UTC under both policies.
+#
+#  - legacy : Aware datetimes are converted to the configured local timezone
+#             and then to ns through a float timestamp. This is exactly what
+#             was done earlier, and is retained for consistency with existing
+#             data and downstream users.
+#  - utc    : Datetimes are converted to ns using integer arithmetic, without
+#             the timezone conversion and without float rounding.
+
+local_tz = pytz.timezone(INTERESTS_MONITORS_LOCAL_TZ)
+_epoch = datetime(1970, 1, 1, tzinfo=timezone.utc)
+_warned_types = set()
+
+
+def now_ns():
+    return time.clock_gettime_ns(time.CLOCK_REALTIME)
+
+
+def _legacy_datetime_ns(timestamp):
+    if timestamp.tzinfo is None or timestamp.tzinfo.utcoffset(timestamp) is None:
+        timestamp = timestamp.replace(tzinfo=pytz.utc)
+    timestamp = timestamp.astimezone(local_tz)
+    return int(timestamp.timestamp() * (10 ** 9))
+
+
+def _utc_datetime_ns(timestamp):
+    if timestamp.tzinfo is None or timestamp.utcoffset() is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    delta = timestamp - _epoch
+    return (delta.days * 86400 + delta.seconds) * (10 ** 9) + delta.microseconds * 1000
+
+
+_datetime_converters = {
+    'legacy': _legacy_datetime_ns,
+    'utc': _utc_datetime_ns,
+}
+datetime_ns = _datetime_converters[INTERESTS_MONITORS_TIMESTAMP_POLICY]
+
+
+def normalize_timestamp(timestamp, context=None):
+    if not timestamp:
+        return now_ns()
+    if type(timestamp) is int:
+        # Generally from time.clock_gettime_ns, already in ns.
+        return timestamp
+    if isinstance(timestamp, datetime):
+        return datetime_ns(timestamp)
+    if isinstance(timestamp, int):
+        return int(timestamp)
+    if type(timestamp) not in _warned_types:
+        _warned_types.add(type(timestamp))
+        logger.warning(f"Got timestamp '{timestamp}' of type {type(timestamp)} "
+                       f"for monitor '{context}'. This is likely incorrect. "
+                       f"Further timestamps of this type will not be reported.")
+    return timestamp
+
+
+def _datetimes_ns(timestamps):
+    # Naive datetimes come out of polars with no timezone and are taken as
+    # UTC. Aware datetimes are converted to UTC by polars.
+    series = polars.Series(timestamps)
+    return (series.dt.epoch(time_unit='us') * 1000).to_list()
+
+
+def normalize_timestamps(timestamps, context=None):
+    # Batch form of normalize_timestamp. Under the utc policy, datetimes in
+    # the batch are converted together.
+    timestamps = list(timestamps)
+    if INTERESTS_MONITORS_TIMESTAMP_POLICY == 'utc':
+        idxs = [i for i, x in enumerate(timestamps) if isinstance(x, datetime)]
+        if len(idxs) > 1:
+            try:
+                converted = _datetimes_ns([timestamps[i] for i in idxs])
+            except Exception as e:
+                logger.debug(f"Could not convert timestamps together, falling back : {e}")
+            else:
+                for i, value in zip(idxs, converted):
+                    timestamps[i] = value
+    return [normalize_timestamp(x, context=context) for x in timestamps]
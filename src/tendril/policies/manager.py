@@ -1,10 +1,14 @@
 
 
-import functools
+import json
+import hashlib
 import importlib
+from types import MappingProxyType
+from fastapi.encoders import jsonable_encoder
 
 from tendril.utils.versions import get_namespace_package_names
 from tendril.db.controllers.interests_policies import register_policy_type
+from tendril.db.controllers.interests_policies import policy_type_ids
 from .base import PolicyBase
 
 from tendril.utils import log
@@ -15,6 +19,7 @@ class PolicyTemplatesManager(object):
     def __init__(self, prefix):
         self._prefix = prefix
         self._templates : dict[str, PolicyBase] = {}
+        self._rendered = None
         self._find_policy_templates()
         self.finalized = False
 
@@ -29,7 +34,6 @@ class PolicyTemplatesManager(object):
                 logger.debug("Loading policy templates from {0}".format(m_name))
                 self._templates.update({x.name: x for x in m.policy_templates})
 
-    @functools.lru_cache
     def _find_assignable_templates(self):
         rv = {
             'interests': {}
@@ -43,11 +47,58 @@ class PolicyTemplatesManager(object):
                     rv['interests'][itype] = {policy}
         return rv
 
+    @staticmethod
+    def _encode_specs(specs):
+        # Encoded as FastAPI did for the endpoint, with response_model_exclude_none
+        # and the separators of its JSONResponse.
+        content = jsonable_encoder(specs, exclude_none=True)
+        content = json.dumps(content, ensure_ascii=False, allow_nan=False,
+                             indent=None, separators=(",", ":")).encode('utf-8')
+        etag = '"{0}"'.format(hashlib.sha1(content).hexdigest())
+        return content, etag
+
+    def _render(self):
+        assignable = self._find_assignable_templates()
+        specs = {name: policy.render_spec() for name, policy in self._templates.items()}
+        types, rendered, encoded = {}, {}, {}
+        for itype, templates in assignable['interests'].items():
+            types[itype] = MappingProxyType({x.name: x for x in templates})
+            rendered[itype] = MappingProxyType({x: specs[x] for x in sorted(types[itype])})
+            encoded[itype] = self._encode_specs(dict(rendered[itype]))
+        return {'assignable': assignable, 'types': types,
+                'specs': rendered, 'json': encoded}
+
+    def render_specs(self):
+        # Assignable templates and their specs for each interest type are
+        # rendered once, after the interest types are loaded, since
+        # can_assign_to needs the interest hierarchy. This cannot happen in
+        # finalize, which runs while the interest types are being imported.
+        self._rendered = self._render()
+
+    def _get_rendered(self):
+        if self._rendered is None:
+            logger.warning("Policy specs requested before rendering. Rendering without caching.")
+            return self._render()
+        return self._rendered
+
+    def assignable_types(self, interest_type):
+        return self._get_rendered()['types'].get(interest_type, MappingProxyType({}))
+
+    def rendered_specs(self, interest_type):
+        return self._get_rendered()['specs'].get(interest_type, MappingProxyType({}))
+
+    def rendered_specs_json(self, interest_type):
+        try:
+            return self._get_rendered()['json'][interest_type]
+        except KeyError:
+            return self._encode_specs({})
+
     def finalize(self):
         for policy_type in self._templates.values():
             logger.debug(f"Registering Policy Type '{policy_type.name}'")
             # TODO This prevents manhole from starting.
             register_policy_type(policy_type)
+        policy_type_ids.load()
         self.finalized = True
 
     @property
@@ -55,9 +106,10 @@ class PolicyTemplatesManager(object):
         return self._templates
 
     def assignable_templates(self, interest_type=None):
+        assignable = self._get_rendered()['assignable']
         if interest_type:
             try:
-                return self._find_assignable_templates()['interests'][interest_type]
+                return assignable['interests'][interest_type]
             except KeyError:
                 return set()
-        return self._find_assignable_templates()
+        return assignable